@@ -0,0 +1,206 @@
+"""Benchmark the agentic-rag index configurations on a local corpus.
+
+Builds the full-document index and a set of chunked indexes over the
+fixture corpus in `benchmark_data/`, then reports build time, peak
+memory, query latency percentiles, and hit-rate/MRR for the stored
+question set. Everything runs offline:
+
+    uv run python benchmark.py
+    uv run python benchmark.py --chunks 500:250 1000:500 --repeat 20
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from search_tools import build_chunked_index, build_full_document_index, load_local_docs
+
+BENCHMARK_DATA = Path(__file__).parent / "benchmark_data"
+
+DEFAULT_CHUNKS = ["3000:1500", "1000:500", "500:250"]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    num_docs: int
+    build_time_ms: float
+    peak_memory_mb: float
+    latency_p50_ms: float
+    latency_p95_ms: float
+    latency_p99_ms: float
+    hit_rate: float
+    mrr: float
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Percentile with linear interpolation between the closest ranks."""
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    fraction = position - lower
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * fraction
+
+
+def first_relevant_rank(results: list[dict[str, Any]], filename: str) -> int | None:
+    for rank, result in enumerate(results, start=1):
+        if result["filename"] == filename:
+            return rank
+    return None
+
+
+def hit_rate(ranks: list[int | None]) -> float:
+    if not ranks:
+        return 0.0
+    return sum(rank is not None for rank in ranks) / len(ranks)
+
+
+def mrr(ranks: list[int | None]) -> float:
+    if not ranks:
+        return 0.0
+    return sum(1 / rank for rank in ranks if rank is not None) / len(ranks)
+
+
+def measure_build(build: Callable[[], Any]) -> tuple[Any, float, float]:
+    """Run `build` and return its result, wall time in ms, and peak memory in MB."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = build()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed * 1000, peak / 1024 / 1024
+
+
+def benchmark_index(
+    name: str,
+    build: Callable[[], Any],
+    questions: list[dict[str, str]],
+    num_results: int = 5,
+    repeat: int = 5,
+) -> BenchmarkResult:
+    index, build_time_ms, peak_memory_mb = measure_build(build)
+
+    latencies = []
+    ranks = []
+
+    for question in questions:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = index.search(query=question["question"], num_results=num_results)
+            latencies.append((time.perf_counter() - start) * 1000)
+        ranks.append(first_relevant_rank(results, question["filename"]))
+
+    return BenchmarkResult(
+        name=name,
+        num_docs=len(index.docs),
+        build_time_ms=build_time_ms,
+        peak_memory_mb=peak_memory_mb,
+        latency_p50_ms=percentile(latencies, 50),
+        latency_p95_ms=percentile(latencies, 95),
+        latency_p99_ms=percentile(latencies, 99),
+        hit_rate=hit_rate(ranks),
+        mrr=mrr(ranks),
+    )
+
+
+def parse_chunk_config(value: str) -> tuple[int, int]:
+    size, step = value.split(":")
+    return int(size), int(step)
+
+
+def run_benchmark(
+    parsed_docs: list[dict[str, Any]],
+    questions: list[dict[str, str]],
+    chunks: list[str] = DEFAULT_CHUNKS,
+    num_results: int = 5,
+    repeat: int = 5,
+) -> list[BenchmarkResult]:
+    results = [
+        benchmark_index(
+            name="full",
+            build=lambda: build_full_document_index(parsed_docs),
+            questions=questions,
+            num_results=num_results,
+            repeat=repeat,
+        )
+    ]
+
+    for chunk_config in chunks:
+        size, step = parse_chunk_config(chunk_config)
+
+        def build(size=size, step=step):
+            index, _ = build_chunked_index(parsed_docs, size=size, step=step)
+            return index
+
+        results.append(
+            benchmark_index(
+                name=f"chunked {size}:{step}",
+                build=build,
+                questions=questions,
+                num_results=num_results,
+                repeat=repeat,
+            )
+        )
+
+    return results
+
+
+def print_results(results: list[BenchmarkResult]) -> None:
+    header = (
+        f"{'index':<20} {'docs':>6} {'build ms':>10} {'peak MB':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'hit rate':>9} {'mrr':>6}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r.name:<20} {r.num_docs:>6} {r.build_time_ms:>10.1f} {r.peak_memory_mb:>8.2f} "
+            f"{r.latency_p50_ms:>8.2f} {r.latency_p95_ms:>8.2f} {r.latency_p99_ms:>8.2f} "
+            f"{r.hit_rate:>9.2f} {r.mrr:>6.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", default=BENCHMARK_DATA / "docs", type=Path,
+                        help="folder with md/mdx files to index")
+    parser.add_argument("--questions", default=BENCHMARK_DATA / "questions.json", type=Path,
+                        help="JSON list of {question, filename} records")
+    parser.add_argument("--chunks", nargs="*", default=DEFAULT_CHUNKS,
+                        help="chunk configurations as size:step")
+    parser.add_argument("--num-results", default=5, type=int)
+    parser.add_argument("--repeat", default=5, type=int,
+                        help="how many times each question is timed")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    parsed_docs = load_local_docs(args.docs)
+    questions = json.loads(args.questions.read_text(encoding="utf-8"))
+
+    results = run_benchmark(
+        parsed_docs,
+        questions,
+        chunks=args.chunks,
+        num_results=args.num_results,
+        repeat=args.repeat,
+    )
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+    else:
+        print_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,19 @@
+import asyncio
+from concurrent.futures import Executor
+from pathlib import Path
 from typing import Any
 
-from gitsource import GithubRepositoryDataReader, chunk_documents
+from gitsource import GithubRepositoryDataReader, RawRepositoryFile, chunk_documents
 from minsearch import Highlighter, Index, Tokenizer
 from minsearch.tokenizer import DEFAULT_ENGLISH_STOP_WORDS
 
 
-def load_evidently_docs() -> list[dict[str, Any]]:
+def load_github_docs(repo: str) -> list[dict[str, Any]]:
+    """Parse the md/mdx files of a GitHub repository given as "owner/name"."""
+    repo_owner, repo_name = repo.split("/")
     reader = GithubRepositoryDataReader(
-        repo_owner="evidentlyai",
-        repo_name="docs",
+        repo_owner=repo_owner,
+        repo_name=repo_name,
         allowed_extensions={"md", "mdx"},
     )
 
@@ -16,6 +21,28 @@ def load_evidently_docs() -> list[dict[str, Any]]:
     return [doc.parse() for doc in files]
 
 
+def load_evidently_docs() -> list[dict[str, Any]]:
+    return load_github_docs("evidentlyai/docs")
+
+
+def load_local_docs(
+    docs_dir: str | Path,
+    allowed_extensions: tuple[str, ...] = ("md", "mdx"),
+) -> list[dict[str, Any]]:
+    """Parse markdown files from a local folder the same way as the GitHub reader."""
+    docs_dir = Path(docs_dir)
+
+    parsed_docs = []
+    for path in sorted(docs_dir.rglob("*")):
+        if path.suffix.lstrip(".") not in allowed_extensions:
+            continue
+        filename = path.relative_to(docs_dir).as_posix()
+        raw_file = RawRepositoryFile(filename=filename, content=path.read_text(encoding="utf-8"))
+        parsed_docs.append(raw_file.parse())
+
+    return parsed_docs
+
+
 def build_chunked_index(parsed_docs: list[dict[str, Any]], size: int = 3000, step: int = 1500):
     chunked_docs = chunk_documents(parsed_docs, size=size, step=step)
 
@@ -85,8 +112,67 @@ class SearchTools:
         return f"file {filename} does not exist"
 
 
+class AsyncSearchTools:
+    """
+    Async variants of the SearchTools methods for agents with async runners.
+
+    Scoring and highlighting run in an executor, so they don't block the
+    event loop, and searches issued in the same turn run in parallel.
+    Pass one executor to all sessions hosted in a process to share it;
+    by default the event loop's executor is used.
+    """
+
+    def __init__(self, search_tools: SearchTools, executor: Executor | None = None):
+        self.search_tools = search_tools
+        self.executor = executor
+
+    async def search(self, query: str) -> list[dict[str, Any]]:
+        """
+        Search the documentation database and return highlighted snippets.
+
+        Args:
+            query: The search query to look up in the index.
+
+        Returns:
+            Matching documents with short highlighted snippets.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.search_tools.search, query)
+
+    async def search_many(self, queries: list[str]) -> list[list[dict[str, Any]]]:
+        """
+        Run several searches in parallel and return highlighted snippets for each.
+
+        Args:
+            queries: The search queries to look up in the index.
+
+        Returns:
+            One list of matching documents per query, in the same order.
+        """
+        return list(await asyncio.gather(*(self.search(query) for query in queries)))
+
+    async def get_file(self, filename: str) -> str:
+        """
+        Retrieve the full contents of a documentation file.
+
+        Args:
+            filename: The filename to retrieve.
+
+        Returns:
+            The full file contents, or an error message if the file is missing.
+        """
+        return self.search_tools.get_file(filename)
+
+
 def create_search_tools(parsed_docs: list[dict[str, Any]]) -> SearchTools:
     index = build_full_document_index(parsed_docs)
     highlighter = build_highlighter()
     file_index = {doc["filename"]: doc["content"] for doc in parsed_docs}
     return SearchTools(index=index, highlighter=highlighter, file_index=file_index)
+
+
+def create_async_search_tools(
+    parsed_docs: list[dict[str, Any]],
+    executor: Executor | None = None,
+) -> AsyncSearchTools:
+    return AsyncSearchTools(create_search_tools(parsed_docs), executor=executor)
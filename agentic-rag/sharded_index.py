@@ -0,0 +1,282 @@
+"""Documentation search over many repositories, one index shard per repo.
+
+Shards are built in parallel processes and pickled to `shard_dir`. At
+query time the shards are searched in parallel (fan-out) and the
+results are merged by their cosine scores (fan-in). Shards
+are loaded on demand and can be unloaded to cap memory:
+
+    sharded = ShardedIndex("shards", max_loaded_shards=10)
+    sharded.build(["evidentlyai/docs", "DataTalksClub/faq"])
+    sharded.search("how to create a dashboard")
+"""
+
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from search_tools import build_full_document_index, load_github_docs
+
+Loader = Callable[[str], list[dict[str, Any]]]
+
+NORMALIZATIONS = ("max", "none")
+
+
+def scored_search(
+    index,
+    query: str,
+    boost_dict: dict[str, float] | None = None,
+    num_results: int = 5,
+) -> list[tuple[dict[str, Any], float]]:
+    """Same ranking as `Index.search`, but also returns the scores."""
+    if boost_dict is None:
+        boost_dict = {}
+
+    if not index.docs:
+        return []
+
+    scores = np.zeros(len(index.docs))
+    for field in index.text_fields:
+        # TF-IDF rows are L2-normalized, so the dot product is the cosine similarity
+        query_vec = index.vectorizers[field].transform([query])
+        sim = (index.text_matrices[field] @ query_vec.T).toarray().ravel()
+        scores += sim * boost_dict.get(field, 1)
+
+    top_indices = np.argsort(-scores)[:num_results]
+    return [(index.docs[i], float(scores[i])) for i in top_indices if scores[i] > 0]
+
+
+def normalize_scores(scores: list[float], normalization: str = "none") -> list[float]:
+    """
+    Scale the merged scores of all shards.
+
+    Scores are cosine similarities, so they are already on the same
+    scale across shards and are merged as is. With "max", they are
+    divided by the best score over all shards, which keeps the ranking
+    and puts the best result at 1.0. Dividing each shard by its own
+    best score would make a weak top hit in one repository look as
+    good as a strong one in another.
+    """
+    if normalization not in NORMALIZATIONS:
+        raise ValueError(f"unknown normalization {normalization!r}, expected one of {NORMALIZATIONS}")
+
+    if normalization == "none" or not scores:
+        return list(scores)
+
+    top = max(scores)
+    if top <= 0:
+        return [0.0 for _ in scores]
+    return [score / top for score in scores]
+
+
+def repo_to_shard_name(repo: str) -> str:
+    # GitHub owners can't contain underscores, so "__" is unambiguous
+    owner, name = repo.split("/")
+    return f"{owner}__{name}"
+
+
+def shard_name_to_repo(shard_name: str) -> str:
+    owner, name = shard_name.split("__", 1)
+    return f"{owner}/{name}"
+
+
+def build_shard(repo: str, shard_path: Path, loader: Loader = load_github_docs) -> int:
+    """Load one repository, index it and pickle the index. Runs in a worker process."""
+    parsed_docs = loader(repo)
+    index = build_full_document_index(parsed_docs)
+
+    tmp_path = shard_path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f_out:
+        pickle.dump(index, f_out)
+    tmp_path.replace(shard_path)
+
+    return len(parsed_docs)
+
+
+class ShardedIndex:
+    """A set of per-repository index shards that can be searched together."""
+
+    def __init__(self, shard_dir: str | Path, max_loaded_shards: int | None = None):
+        """
+        `max_loaded_shards` caps the number of shards kept in memory. A
+        query loads every shard it searches, so with fewer slots than
+        repositories each query reloads the shards from disk: set it to
+        at least the number of repositories a query usually covers.
+        """
+        self.shard_dir = Path(shard_dir)
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        self.max_loaded_shards = max_loaded_shards
+
+        # repo -> index, least recently used first
+        self.shards = OrderedDict()
+        self._lock = threading.Lock()
+        # one lock per repo, so a shard is unpickled once and other shards load meanwhile
+        self._load_locks: dict[str, threading.Lock] = {}
+
+    def shard_path(self, repo: str) -> Path:
+        return self.shard_dir / f"{repo_to_shard_name(repo)}.pkl"
+
+    @property
+    def repos(self) -> list[str]:
+        """All repositories with a built shard, loaded or not."""
+        return sorted(shard_name_to_repo(path.stem) for path in self.shard_dir.glob("*.pkl"))
+
+    @property
+    def loaded(self) -> list[str]:
+        with self._lock:
+            return list(self.shards)
+
+    def build(
+        self,
+        repos: list[str],
+        loader: Loader = load_github_docs,
+        max_workers: int | None = None,
+    ) -> dict[str, int]:
+        """
+        Build one shard per repository in parallel processes.
+
+        Rebuilt shards that are currently loaded are unloaded, so the next
+        query picks up the new version.
+
+        Returns:
+            The number of indexed documents for each repository.
+        """
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                repo: executor.submit(build_shard, repo, self.shard_path(repo), loader)
+                for repo in repos
+            }
+            num_docs = {repo: future.result() for repo, future in futures.items()}
+
+        for repo in repos:
+            self.unload(repo)
+
+        return num_docs
+
+    def load(self, repo: str):
+        """Return the shard for `repo`, loading it from disk if needed."""
+        with self._lock:
+            if repo in self.shards:
+                self.shards.move_to_end(repo)
+                return self.shards[repo]
+            load_lock = self._load_locks.setdefault(repo, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                # another thread may have loaded it while we waited
+                if repo in self.shards:
+                    self.shards.move_to_end(repo)
+                    return self.shards[repo]
+
+            shard_path = self.shard_path(repo)
+            if not shard_path.exists():
+                raise KeyError(f"no shard for {repo}, build it first")
+
+            with open(shard_path, "rb") as f_in:
+                index = pickle.load(f_in)
+
+            with self._lock:
+                self.shards[repo] = index
+
+                if self.max_loaded_shards is not None:
+                    while len(self.shards) > self.max_loaded_shards:
+                        self.shards.popitem(last=False)
+
+        return index
+
+    def unload(self, repo: str) -> None:
+        with self._lock:
+            self.shards.pop(repo, None)
+
+    def search(
+        self,
+        query: str,
+        num_results: int = 5,
+        repos: list[str] | None = None,
+        boost_dict: dict[str, float] | None = None,
+        normalization: str = "none",
+    ) -> list[dict[str, Any]]:
+        """
+        Search the shards in parallel and merge the results.
+
+        Each result is a copy of the document with two extra fields:
+        `repo` and the `score`, see `normalize_scores`.
+        """
+        if repos is None:
+            repos = self.repos
+
+        def search_shard(repo):
+            index = self.load(repo)
+            hits = scored_search(index, query, boost_dict=boost_dict, num_results=num_results)
+            return [{**doc, "repo": repo, "score": score} for doc, score in hits]
+
+        # a shard evicted from the cache stays in memory until its thread is
+        # done with it, so the number of threads also caps memory per query
+        max_workers = max(len(repos), 1)
+        if self.max_loaded_shards is not None:
+            max_workers = min(max_workers, self.max_loaded_shards)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            shard_results = list(executor.map(search_shard, repos))
+
+        merged = [result for results in shard_results for result in results]
+        merged.sort(key=lambda result: result["score"], reverse=True)
+        merged = merged[:num_results]
+
+        scores = normalize_scores([result["score"] for result in merged], normalization)
+        for result, score in zip(merged, scores):
+            result["score"] = score
+
+        return merged
+
+    def get_file(self, repo: str, filename: str) -> str | None:
+        index = self.load(repo)
+        for doc in index.docs:
+            if doc["filename"] == filename:
+                return doc["content"]
+        return None
+
+
+class ShardedSearchTools:
+    """Search and file retrieval tools over documentation from many repositories."""
+
+    def __init__(self, sharded_index: ShardedIndex, highlighter):
+        self.sharded_index = sharded_index
+        self.highlighter = highlighter
+
+    def search(self, query: str) -> list[dict[str, Any]]:
+        """
+        Search the documentation of all repositories and return highlighted snippets.
+
+        Args:
+            query: The search query to look up in the index.
+
+        Returns:
+            Matching documents with short highlighted snippets and the repository they come from.
+        """
+        search_results = self.sharded_index.search(query=query, num_results=5)
+        return self.highlighter.highlight(query, search_results)
+
+    def get_file(self, repo: str, filename: str) -> str:
+        """
+        Retrieve the full contents of a documentation file.
+
+        Args:
+            repo: The repository of the file, as returned by search.
+            filename: The filename to retrieve.
+
+        Returns:
+            The full file contents, or an error message if the file is missing.
+        """
+        try:
+            content = self.sharded_index.get_file(repo, filename)
+        except KeyError:
+            return f"repository {repo} does not exist"
+
+        if content is None:
+            return f"file {filename} does not exist in {repo}"
+        return content
@@ -0,0 +1,42 @@
+import json
+
+from benchmark import BENCHMARK_DATA, first_relevant_rank, hit_rate, mrr, percentile, run_benchmark
+from search_tools import load_local_docs
+
+
+def test_percentile_interpolates_between_ranks():
+    values = [4.0, 1.0, 3.0, 2.0]
+
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4.0
+    assert percentile([], 95) == 0.0
+
+
+def test_hit_rate_and_mrr():
+    results = [{"filename": "a.md"}, {"filename": "b.md"}]
+
+    ranks = [
+        first_relevant_rank(results, "a.md"),
+        first_relevant_rank(results, "b.md"),
+        first_relevant_rank(results, "c.md"),
+    ]
+
+    assert ranks == [1, 2, None]
+    assert hit_rate(ranks) == 2 / 3
+    assert mrr(ranks) == (1 + 0.5) / 3
+
+
+def test_run_benchmark_on_fixture_corpus():
+    parsed_docs = load_local_docs(BENCHMARK_DATA / "docs")
+    questions = json.loads((BENCHMARK_DATA / "questions.json").read_text())
+
+    results = run_benchmark(parsed_docs, questions, chunks=["500:250"], repeat=1)
+
+    assert [r.name for r in results] == ["full", "chunked 500:250"]
+    assert results[0].num_docs == len(parsed_docs)
+    assert results[1].num_docs > len(parsed_docs)
+    for r in results:
+        assert 0 < r.hit_rate <= 1
+        assert 0 < r.mrr <= r.hit_rate
+        assert r.latency_p50_ms <= r.latency_p99_ms
@@ -1,4 +1,8 @@
-from search_tools import SearchTools
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from search_tools import AsyncSearchTools, SearchTools
 
 
 class FakeIndex:
@@ -50,3 +54,37 @@ def test_get_file_returns_clear_message_for_missing_file():
     tools = SearchTools(index=FakeIndex(), highlighter=FakeHighlighter(), file_index={})
 
     assert tools.get_file("missing.md") == "file missing.md does not exist"
+
+
+def test_async_search_runs_queries_in_executor():
+    class RecordingIndex(FakeIndex):
+        def __init__(self):
+            self.threads = set()
+
+        def search(self, query, num_results):
+            self.threads.add(threading.current_thread().name)
+            return super().search(query, num_results)
+
+    index = RecordingIndex()
+    tools = SearchTools(
+        index=index,
+        highlighter=FakeHighlighter(),
+        file_index={"docs/dashboard.md": "full dashboard document"},
+    )
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="search") as executor:
+        async_tools = AsyncSearchTools(tools, executor=executor)
+
+        async def run():
+            single = await async_tools.search("create dashboard")
+            many = await async_tools.search_many(["dashboard", "report"])
+            file = await async_tools.get_file("docs/dashboard.md")
+            return single, many, file
+
+        single, many, file = asyncio.run(run())
+
+    assert single[0]["filename"] == "docs/dashboard.md"
+    assert len(many) == 2
+    assert many[1][0]["content"] == ["Create a dashboard with a report and panels."]
+    assert file == "full dashboard document"
+    assert all(name.startswith("search") for name in index.threads)
@@ -0,0 +1,134 @@
+import pickle
+import threading
+
+import pytest
+
+from benchmark import BENCHMARK_DATA
+from search_tools import build_full_document_index, load_local_docs
+from sharded_index import ShardedIndex, normalize_scores, scored_search
+
+FIXTURE_REPOS = {
+    "acme/monitoring": ["dashboards.mdx", "data-drift.mdx", "tests.mdx", "self-hosting.mdx"],
+    "acme/llm_docs": ["descriptors.mdx", "tracing.mdx", "installation.mdx", "reports.mdx"],
+}
+
+
+def load_fixture_repo(repo):
+    parsed_docs = load_local_docs(BENCHMARK_DATA / "docs")
+    return [doc for doc in parsed_docs if doc["filename"] in FIXTURE_REPOS[repo]]
+
+
+def load_drift_repo(repo):
+    if repo == "acme/strong":
+        return [
+            {"title": "Data drift", "description": "Data drift detection",
+             "content": "Detect data drift with a data drift report.", "filename": "drift.mdx"},
+            {"title": "Install", "description": "Installation",
+             "content": "Install the package with pip.", "filename": "install.mdx"},
+        ]
+    return [
+        {"title": "Changelog", "description": "Release notes",
+         "content": f"Many fixes in {repo}, one of them mentions drift once among other words.",
+         "filename": "changelog.mdx"},
+        {"title": "Install", "description": "Installation",
+         "content": "Install the package with pip.", "filename": "install.mdx"},
+    ]
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    sharded = ShardedIndex(tmp_path, max_loaded_shards=1)
+    num_docs = sharded.build(list(FIXTURE_REPOS), loader=load_fixture_repo, max_workers=2)
+    assert num_docs == {"acme/monitoring": 4, "acme/llm_docs": 4}
+    return sharded
+
+
+def test_scored_search_matches_index_ranking():
+    parsed_docs = load_local_docs(BENCHMARK_DATA / "docs")
+    index = build_full_document_index(parsed_docs)
+
+    hits = scored_search(index, "statistical test for drift", num_results=3)
+    expected = index.search("statistical test for drift", num_results=3)
+
+    assert [doc["filename"] for doc, _ in hits] == [doc["filename"] for doc in expected]
+    scores = [score for _, score in hits]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_normalize_scores():
+    assert normalize_scores([0.4, 0.2]) == [0.4, 0.2]
+    assert normalize_scores([0.4, 0.2], "max") == [1.0, 0.5]
+    assert normalize_scores([]) == []
+    with pytest.raises(ValueError):
+        normalize_scores([0.1], "zscore")
+
+
+def test_search_fans_out_to_all_shards(sharded):
+    assert sharded.repos == ["acme/llm_docs", "acme/monitoring"]
+
+    results = sharded.search("how do I trace my llm app or run a drift check", num_results=10)
+
+    assert {result["repo"] for result in results} == set(FIXTURE_REPOS)
+    scores = [result["score"] for result in results]
+    assert scores == sorted(scores, reverse=True)
+    assert 0 < scores[0] < 1.0
+    assert len(sharded.loaded) == 1
+
+    normalized = sharded.search("how do I trace my llm app or run a drift check", num_results=10, normalization="max")
+    assert [result["filename"] for result in normalized] == [result["filename"] for result in results]
+    assert normalized[0]["score"] == 1.0
+
+
+def test_strong_match_outranks_weak_matches_in_other_repos(tmp_path):
+    sharded = ShardedIndex(tmp_path)
+    sharded.build(["acme/strong", "acme/weak1", "acme/weak2"], loader=load_drift_repo, max_workers=1)
+
+    results = sharded.search("data drift", num_results=3)
+
+    assert results[0]["repo"] == "acme/strong"
+    assert all(result["score"] < results[0]["score"] for result in results[1:])
+
+
+def test_search_selected_repos(sharded):
+    results = sharded.search("drift", repos=["acme/monitoring"])
+
+    assert results[0]["filename"] == "data-drift.mdx"
+    assert {result["repo"] for result in results} == {"acme/monitoring"}
+
+
+def test_load_and_unload(sharded):
+    sharded.load("acme/llm_docs")
+    assert sharded.loaded == ["acme/llm_docs"]
+
+    sharded.unload("acme/llm_docs")
+    assert sharded.loaded == []
+
+    assert sharded.get_file("acme/llm_docs", "tracing.mdx").startswith("Tracing records")
+    assert sharded.get_file("acme/llm_docs", "missing.mdx") is None
+
+    with pytest.raises(KeyError):
+        sharded.load("acme/unknown")
+
+
+def test_concurrent_loads_unpickle_a_shard_once(sharded, monkeypatch):
+    loads = []
+    barrier = threading.Barrier(4)
+    pickle_load = pickle.load
+
+    def counting_load(f_in):
+        loads.append(f_in.name)
+        return pickle_load(f_in)
+
+    monkeypatch.setattr(pickle, "load", counting_load)
+
+    def load():
+        barrier.wait()
+        sharded.load("acme/llm_docs")
+
+    threads = [threading.Thread(target=load) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
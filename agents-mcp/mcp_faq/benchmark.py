@@ -0,0 +1,112 @@
+"""
+Throughput benchmark for the FAQ MCP server.
+
+Simulates several MCP clients that call `search` (and sometimes
+`add_entry`) at the same time. The clients talk to the server through
+the in-memory transport, so no network is involved:
+
+    uv run python benchmark.py --clients 1 4 16 --requests 200
+    uv run python benchmark.py --synthetic 5000 --write-ratio 0.05
+"""
+
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+from fastmcp import Client
+
+from main import build_index, init_index, init_mcp
+from search_tools import SearchTools
+
+
+WORDS = (
+    'docker kafka spark airflow terraform bigquery postgres python sql '
+    'install error port container pipeline homework deadline certificate '
+    'module week credentials permission gcp cloud storage bucket table '
+    'partition cluster batch streaming schema notebook jupyter environment'
+).split()
+
+
+def synthetic_documents(n: int, seed: int = 1) -> list[dict]:
+    rng = random.Random(seed)
+
+    documents = []
+    for i in range(n):
+        documents.append({
+            'question': ' '.join(rng.choices(WORDS, k=8)) + '?',
+            'text': ' '.join(rng.choices(WORDS, k=60)),
+            'section': f'Module {i % 6}',
+            'course': 'data-engineering-zoomcamp',
+        })
+    return documents
+
+
+def percentile(values: list[float], p: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method='inclusive')[p - 1]
+
+
+async def run_client(mcp, queries, num_requests, write_ratio, rng, latencies):
+    async with Client(mcp) as client:
+        for _ in range(num_requests):
+            if rng.random() < write_ratio:
+                tool = 'add_entry'
+                args = {'question': rng.choice(queries), 'answer': 'added by the benchmark'}
+            else:
+                tool = 'search'
+                args = {'query': rng.choice(queries)}
+
+            start = time.perf_counter()
+            await client.call_tool(tool, args)
+            latencies[tool].append((time.perf_counter() - start) * 1000)
+
+
+async def run_benchmark(mcp, queries, num_clients, num_requests, write_ratio, seed=1):
+    latencies = {'search': [], 'add_entry': []}
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        run_client(mcp, queries, num_requests, write_ratio, random.Random(seed + i), latencies)
+        for i in range(num_clients)
+    ))
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(values) for values in latencies.values())
+    return total / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the FAQ MCP server with simulated clients')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=100, help='requests per client')
+    parser.add_argument('--write-ratio', type=float, default=0.01, help='share of add_entry calls')
+    parser.add_argument('--synthetic', type=int, default=0,
+                        help='index this many synthetic documents instead of the FAQ')
+    args = parser.parse_args()
+
+    for num_clients in args.clients:
+        # a fresh index for each run, so appends from the previous run don't count
+        if args.synthetic:
+            index = build_index(synthetic_documents(args.synthetic))
+        else:
+            index = init_index()
+
+        queries = [doc['question'] for doc in index.docs]
+        mcp = init_mcp(SearchTools(index))
+
+        qps, latencies = asyncio.run(run_benchmark(
+            mcp, queries, num_clients, args.requests, args.write_ratio,
+        ))
+
+        print(f'clients={num_clients:<4} qps={qps:8.1f}', end='')
+        for tool, values in latencies.items():
+            if values:
+                print(f'  {tool}: p50={percentile(values, 50):.1f}ms p95={percentile(values, 95):.1f}ms', end='')
+        print()
+
+
+if __name__ == '__main__':
+    main()
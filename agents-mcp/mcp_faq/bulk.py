@@ -0,0 +1,60 @@
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, Any, List
+
+
+def question_hash(question: str, course: str = '') -> str:
+    """Hash of the course and question with case and whitespace normalized, used for de-duplication."""
+    normalized = course + '\n' + ' '.join(question.lower().split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def num_docs(index) -> int:
+    """Number of documents without building a list: AppendableIndex has no __len__, the wrappers do."""
+    if hasattr(index, '__len__'):
+        return len(index)
+    return len(index.docs)
+
+
+def read_jsonl(path: str | Path) -> List[Dict[str, Any]]:
+    entries = []
+
+    with open(path, 'r', encoding='utf-8') as f_in:
+        for line in f_in:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+
+    return entries
+
+
+# from this many documents on, refitting is cheaper than appending one by one
+REFIT_MIN_BATCH = 50
+
+
+def append_many(index, docs: List[Dict[str, Any]]):
+    """
+    Append a batch of documents to an AppendableIndex.
+
+    `AppendableIndex.append` recomputes IDF values and document norms
+    for the whole index after every document, so appending N documents
+    one by one costs N passes over the index. For batches of at least
+    REFIT_MIN_BATCH documents we rebuild the index instead: `fit` on the
+    old and new documents tokenizes everything again, but it's a single
+    pass. Smaller batches are appended one by one. Only the public
+    minsearch API is used.
+    """
+    if not docs:
+        return index
+
+    # CourseIndex and DurableIndex route the batch themselves
+    if hasattr(index, 'append_many'):
+        return index.append_many(docs)
+
+    if len(docs) < REFIT_MIN_BATCH:
+        for doc in docs:
+            index.append(doc)
+        return index
+
+    return index.fit(list(index.docs) + list(docs))
@@ -0,0 +1,162 @@
+import json
+import time
+import pickle
+import hashlib
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Any, List
+
+import requests
+from minsearch import AppendableIndex
+
+
+logger = logging.getLogger(__name__)
+
+DOCS_URL = 'https://github.com/alexeygrigorev/llm-rag-workshop/raw/main/notebooks/documents.json'
+
+
+def flatten_documents(documents_raw: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {**doc, 'course': course['course']}
+        for course in documents_raw
+        for doc in course['documents']
+    ]
+
+
+class CorpusCache:
+    """
+    Local cache of the FAQ documents and of the index built from them.
+
+    The documents are revalidated with a conditional GET (ETag /
+    Last-Modified) at most once per `max_age` seconds. Within that
+    window, and whenever the network is unavailable, the server starts
+    from the pickled index without touching the network or the JSON.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        url: str = DOCS_URL,
+        timeout: float = 10.0,
+        max_age: float = 24 * 60 * 60,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.url = url
+        self.timeout = timeout
+        self.max_age = max_age
+
+        self.documents_path = self.cache_dir / 'documents.json'
+        self.meta_path = self.cache_dir / 'documents.meta.json'
+        self.index_path = self.cache_dir / 'index.pkl'
+
+    def read_meta(self) -> Dict[str, Any]:
+        if not self.meta_path.exists():
+            return {}
+        return json.loads(self.meta_path.read_text(encoding='utf-8'))
+
+    def write_meta(self, meta: Dict[str, Any]) -> None:
+        self.meta_path.write_text(json.dumps(meta), encoding='utf-8')
+
+    def is_fresh(self, meta: Dict[str, Any]) -> bool:
+        fetched_at = meta.get('fetched_at', 0)
+        return time.time() - fetched_at < self.max_age
+
+    def revalidate(self) -> Dict[str, Any]:
+        """
+        Make sure the cached documents are up to date and return the metadata.
+
+        If the server can't be reached, the cached copy is used as is.
+        """
+        meta = self.read_meta()
+        has_cache = self.documents_path.exists() and 'sha256' in meta
+
+        headers = {}
+        if has_cache:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            response = requests.get(self.url, headers=headers, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            if not has_cache:
+                raise
+            logger.warning(f'could not revalidate {self.url}, using the cached copy: {e}')
+            return meta
+
+        if response.status_code == 304:
+            meta['fetched_at'] = time.time()
+            self.write_meta(meta)
+            return meta
+
+        documents = flatten_documents(response.json())
+        content = json.dumps(documents).encode('utf-8')
+
+        tmp_path = self.documents_path.with_suffix('.tmp')
+        tmp_path.write_bytes(content)
+        tmp_path.replace(self.documents_path)
+
+        meta = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': hashlib.sha256(content).hexdigest(),
+            'fetched_at': time.time(),
+        }
+        self.write_meta(meta)
+        return meta
+
+    def load_documents(self) -> List[Dict[str, Any]]:
+        meta = self.read_meta()
+        if not (self.documents_path.exists() and self.is_fresh(meta)):
+            self.revalidate()
+        return json.loads(self.documents_path.read_text(encoding='utf-8'))
+
+    def load_index(
+        self,
+        build_index: Callable[[List[Dict[str, Any]]], AppendableIndex],
+        version: int = 1,
+    ) -> AppendableIndex:
+        """
+        Return the index for the current documents, building and
+        saving it only when the documents changed.
+
+        The snapshot is also rebuilt when it was made by another
+        `build_index` function or another `version` of it: bump the
+        version when the index layout changes.
+        """
+        meta = self.read_meta()
+        if not self.is_fresh(meta):
+            meta = self.revalidate()
+
+        key = {
+            'sha256': meta['sha256'],
+            # not the module: it's __main__ or main depending on the entry point
+            'builder': build_index.__qualname__,
+            'version': version,
+        }
+
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'rb') as f_in:
+                    snapshot = pickle.load(f_in)
+            except Exception as e:
+                # e.g. the pickled classes were renamed since
+                logger.warning(f'could not load {self.index_path}, rebuilding the index: {e}')
+                snapshot = {}
+
+            if snapshot.get('key') == key:
+                return snapshot['index']
+
+        documents = json.loads(self.documents_path.read_text(encoding='utf-8'))
+        index = build_index(documents)
+
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f_out:
+            pickle.dump({'index': index, 'key': key}, f_out)
+        tmp_path.replace(self.index_path)
+
+        return index
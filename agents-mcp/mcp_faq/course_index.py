@@ -0,0 +1,104 @@
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+
+from minsearch import AppendableIndex
+
+from bulk import append_many
+
+
+class CourseIndex:
+    """
+    One AppendableIndex per course behind the AppendableIndex interface.
+
+    A search filtered by course scores only the documents of that
+    course instead of scoring the whole multi-course corpus and then
+    masking out the other courses.
+    """
+
+    def __init__(self, text_fields: List[str], keyword_fields: Optional[List[str]] = None, course_field: str = 'course'):
+        self.text_fields = text_fields
+        self.keyword_fields = keyword_fields or []
+        self.course_field = course_field
+        self.indexes: Dict[str, AppendableIndex] = {}
+        # updated by fit and append_many, which run under the SearchTools
+        # write lock, so __len__ doesn't have to walk the course indexes
+        self.num_docs = 0
+
+    def _new_index(self) -> AppendableIndex:
+        return AppendableIndex(
+            text_fields=self.text_fields,
+            keyword_fields=self.keyword_fields,
+        )
+
+    @property
+    def courses(self) -> List[str]:
+        return sorted(self.indexes)
+
+    @property
+    def docs(self) -> List[Dict[str, Any]]:
+        # a new list on every access, use len() for the number of documents
+        return [doc for index in self.indexes.values() for doc in index.docs]
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        # snapshots pickled before num_docs existed
+        self.__dict__.update(state)
+        if 'num_docs' not in state:
+            self.num_docs = sum(len(index.docs) for index in self.indexes.values())
+
+    def fit(self, docs: List[Dict[str, Any]]) -> 'CourseIndex':
+        by_course = defaultdict(list)
+        for doc in docs:
+            by_course[doc[self.course_field]].append(doc)
+
+        self.indexes = {}
+        for course, course_docs in by_course.items():
+            self.indexes[course] = self._new_index().fit(course_docs)
+
+        self.num_docs = len(docs)
+        return self
+
+    def append(self, doc: Dict[str, Any]) -> 'CourseIndex':
+        return self.append_many([doc])
+
+    def append_many(self, docs: List[Dict[str, Any]]) -> 'CourseIndex':
+        by_course = defaultdict(list)
+        for doc in docs:
+            by_course[doc[self.course_field]].append(doc)
+
+        for course, course_docs in by_course.items():
+            if course not in self.indexes:
+                self.indexes[course] = self._new_index().fit(course_docs)
+            else:
+                append_many(self.indexes[course], course_docs)
+
+        self.num_docs += len(docs)
+        return self
+
+    def search(
+        self,
+        query: str,
+        filter_dict: Optional[Dict] = None,
+        boost_dict: Optional[Dict] = None,
+        num_results: int = 10,
+        output_ids: bool = False,
+    ) -> List[Dict[str, Any]]:
+        filter_dict = dict(filter_dict or {})
+
+        course = filter_dict.pop(self.course_field, None)
+        if not isinstance(course, str):
+            raise ValueError(f'CourseIndex needs a single {self.course_field} in filter_dict, got {course!r}')
+
+        index = self.indexes.get(course)
+        if index is None:
+            return []
+
+        return index.search(
+            query=query,
+            filter_dict=filter_dict,
+            boost_dict=boost_dict,
+            num_results=num_results,
+            output_ids=output_ids,
+        )
@@ -0,0 +1,160 @@
+import os
+import json
+import pickle
+from pathlib import Path
+from typing import Callable, Dict, Any, List
+
+from minsearch import AppendableIndex
+
+from bulk import append_many, num_docs
+
+
+class DurableIndex:
+    """
+    AppendableIndex that keeps user-added entries across restarts.
+
+    Every appended document is written to an append-only log before it
+    goes into the in-memory index. Every `snapshot_every` appends, the
+    whole index is pickled into a snapshot and the log is truncated.
+    On startup we load the snapshot and replay the log on top of it,
+    so the index is never rebuilt from scratch.
+
+    Log records carry a sequence number and the snapshot stores the last
+    sequence number it contains, so a crash between writing the snapshot
+    and truncating the log doesn't apply entries twice.
+    """
+
+    snapshot_filename = 'index.snapshot'
+    log_filename = 'entries.log'
+
+    def __init__(self, index: AppendableIndex, data_dir: str | Path, seq: int = 0, snapshot_every: int = 1000):
+        self.index = index
+        self.data_dir = Path(data_dir)
+        self.seq = seq
+        self.snapshot_every = snapshot_every
+
+        self.snapshot_path = self.data_dir / self.snapshot_filename
+        self.log_path = self.data_dir / self.log_filename
+
+        self.unsnapshotted = 0
+        self.log_file = open(self.log_path, 'a', encoding='utf-8')
+
+    @classmethod
+    def open(
+        cls,
+        data_dir: str | Path,
+        build_index: Callable[[], AppendableIndex],
+        snapshot_every: int = 1000,
+    ) -> 'DurableIndex':
+        """
+        Load the index from `data_dir`, creating it with `build_index`
+        if there's no snapshot yet.
+        """
+        data_dir = Path(data_dir)
+        data_dir.mkdir(parents=True, exist_ok=True)
+
+        snapshot_path = data_dir / cls.snapshot_filename
+
+        if snapshot_path.exists():
+            with open(snapshot_path, 'rb') as f_in:
+                snapshot = pickle.load(f_in)
+            index = snapshot['index']
+            seq = snapshot['seq']
+            needs_snapshot = False
+        else:
+            index = build_index()
+            seq = 0
+            needs_snapshot = True
+
+        log_path = data_dir / cls.log_filename
+        entries = read_log(log_path, after_seq=seq)
+        # one by one, so the index isn't rebuilt however long the log is
+        for entry_seq, doc in entries:
+            index.append(doc)
+            seq = entry_seq
+
+        if log_path.exists() and log_path.stat().st_size > 0:
+            # also gets rid of a torn last line, so new records aren't appended to it
+            needs_snapshot = True
+
+        durable_index = cls(index, data_dir, seq=seq, snapshot_every=snapshot_every)
+
+        if needs_snapshot:
+            durable_index.compact()
+
+        return durable_index
+
+    def append(self, doc: Dict[str, Any]) -> 'DurableIndex':
+        self.write_log([doc])
+        self.index.append(doc)
+        self.maybe_compact(1)
+        return self
+
+    def append_many(self, docs: List[Dict[str, Any]]) -> 'DurableIndex':
+        """Append a batch with a single fsync, see `bulk.append_many` for the index update."""
+        self.write_log(docs)
+        append_many(self.index, docs)
+        self.maybe_compact(len(docs))
+        return self
+
+    def write_log(self, docs: List[Dict[str, Any]]) -> None:
+        for doc in docs:
+            self.seq += 1
+            record = {'seq': self.seq, 'doc': doc}
+            self.log_file.write(json.dumps(record) + '\n')
+
+        self.log_file.flush()
+        os.fsync(self.log_file.fileno())
+
+    def maybe_compact(self, num_appended: int) -> None:
+        self.unsnapshotted += num_appended
+        if self.unsnapshotted >= self.snapshot_every:
+            self.compact()
+
+    def search(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return self.index.search(*args, **kwargs)
+
+    @property
+    def docs(self) -> List[Dict[str, Any]]:
+        return self.index.docs
+
+    def __len__(self) -> int:
+        return num_docs(self.index)
+
+    def compact(self) -> None:
+        """Write a snapshot of the current index and truncate the log."""
+        tmp_path = self.snapshot_path.with_suffix('.tmp')
+
+        with open(tmp_path, 'wb') as f_out:
+            pickle.dump({'index': self.index, 'seq': self.seq}, f_out)
+            f_out.flush()
+            os.fsync(f_out.fileno())
+
+        os.replace(tmp_path, self.snapshot_path)
+
+        self.log_file.close()
+        self.log_file = open(self.log_path, 'w', encoding='utf-8')
+        self.unsnapshotted = 0
+
+    def close(self) -> None:
+        self.log_file.close()
+
+
+def read_log(log_path: Path, after_seq: int = 0) -> List[tuple[int, Dict[str, Any]]]:
+    if not log_path.exists():
+        return []
+
+    entries = []
+
+    with open(log_path, 'r', encoding='utf-8') as f_in:
+        for line in f_in:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # a torn write from a crash, only possible for the last line
+                break
+
+            if record['seq'] > after_seq:
+                entries.append((record['seq'], record['doc']))
+
+    return entries
@@ -1,27 +1,24 @@
-import requests 
-from minsearch import AppendableIndex
+import os
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
 from fastmcp import FastMCP
+from starlette.responses import JSONResponse
 from toyaikit.tools import wrap_instance_methods
 
-from search_tools import SearchTools
-
-
-def init_index():
-    docs_url = 'https://github.com/alexeygrigorev/llm-rag-workshop/raw/main/notebooks/documents.json'
-    docs_response = requests.get(docs_url)
-    documents_raw = docs_response.json()
+from search_tools import SearchTools, AsyncSearchTools
+from durable_index import DurableIndex
+from corpus import CorpusCache
+from course_index import CourseIndex
 
-    documents = []
 
-    for course in documents_raw:
-        course_name = course['course']
+# bump when build_index changes, so cached indexes are rebuilt
+INDEX_VERSION = 1
 
-        for doc in course['documents']:
-            doc['course'] = course_name
-            documents.append(doc)
 
-
-    index = AppendableIndex(
+def build_index(documents):
+    # a separate index per course, so a query scores only its course
+    index = CourseIndex(
         text_fields=["question", "text", "section"],
         keyword_fields=["course"]
     )
@@ -30,15 +27,44 @@ def init_index():
     return index
 
 
+def init_index():
+    # documents.json and the index built from it are cached locally, so
+    # the server starts without the network and without re-indexing
+    cache_dir = os.getenv('FAQ_CACHE_DIR', Path.home() / '.cache' / 'mcp-faq')
+    corpus = CorpusCache(cache_dir)
+    return corpus.load_index(build_index, version=INDEX_VERSION)
+
+
 def init_tools():
-    index = init_index()
-    return SearchTools(index)
+    # with FAQ_DATA_DIR set, entries added by users survive restarts
+    data_dir = os.getenv('FAQ_DATA_DIR')
+
+    if data_dir:
+        index = DurableIndex.open(data_dir, build_index=init_index)
+    else:
+        index = init_index()
+
+    # clients are remote, so they can import files only from FAQ_IMPORT_DIR
+    return SearchTools(index, import_dir=os.getenv('FAQ_IMPORT_DIR'))
+
 
+def init_mcp(search_tools=None):
+    if search_tools is None:
+        search_tools = init_tools()
+
+    # tools run in a thread pool, so many clients are served concurrently
+    max_workers = int(os.getenv('FAQ_SEARCH_WORKERS', '8'))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    agent_tools = AsyncSearchTools(search_tools, executor=executor)
 
-def init_mcp():
     mcp = FastMCP("Demo 🚀")
-    agent_tools = init_tools()
     wrap_instance_methods(mcp.tool, agent_tools)
+
+    # the same numbers as the stats tool, for dashboards and curl
+    @mcp.custom_route("/stats", methods=["GET"])
+    async def stats_route(request):
+        return JSONResponse(agent_tools._stats())
+
     return mcp
 
 
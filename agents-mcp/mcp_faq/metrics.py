@@ -0,0 +1,113 @@
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Any, Hashable
+
+
+# upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LRUCache:
+    """Thread-safe LRU cache that counts hits and misses."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        with self._lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return self.data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value) -> None:
+        with self._lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class ToolMetrics:
+    """Call counts, recent QPS and latency histograms for each tool."""
+
+    def __init__(self, window_seconds: float = 60.0):
+        self.window_seconds = window_seconds
+        self.started_at = time.time()
+
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.histograms: Dict[str, list[int]] = {}
+        self.recent = deque()
+
+        self._lock = threading.Lock()
+
+    def observe(self, tool: str, seconds: float, error: bool = False) -> None:
+        latency_ms = seconds * 1000
+        now = time.time()
+
+        with self._lock:
+            self.calls[tool] = self.calls.get(tool, 0) + 1
+            if error:
+                self.errors[tool] = self.errors.get(tool, 0) + 1
+
+            histogram = self.histograms.setdefault(tool, [0] * (len(LATENCY_BUCKETS_MS) + 1))
+            bucket = len(LATENCY_BUCKETS_MS)
+            for i, upper in enumerate(LATENCY_BUCKETS_MS):
+                if latency_ms <= upper:
+                    bucket = i
+                    break
+            histogram[bucket] += 1
+
+            self.recent.append(now)
+            self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        while self.recent and self.recent[0] < now - self.window_seconds:
+            self.recent.popleft()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+
+        with self._lock:
+            self._trim(now)
+            uptime = now - self.started_at
+            window = min(self.window_seconds, uptime) or 1.0
+
+            labels = [f'<={upper}ms' for upper in LATENCY_BUCKETS_MS] + [f'>{LATENCY_BUCKETS_MS[-1]}ms']
+
+            tools = {}
+            for tool, histogram in self.histograms.items():
+                tools[tool] = {
+                    'calls': self.calls[tool],
+                    'errors': self.errors.get(tool, 0),
+                    'latency_histogram': dict(zip(labels, histogram)),
+                }
+
+            return {
+                'uptime_seconds': uptime,
+                'qps': len(self.recent) / window,
+                'tools': tools,
+            }
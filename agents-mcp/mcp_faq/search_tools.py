@@ -1,43 +1,238 @@
+import time
+import asyncio
+from pathlib import Path
+from concurrent.futures import Executor
 from typing import List, Dict, Any
 
+from locks import RWLock
+from bulk import append_many, num_docs, question_hash, read_jsonl
+from metrics import LRUCache, ToolMetrics
+
+
+DEFAULT_COURSE = 'data-engineering-zoomcamp'
+
+
 class SearchTools:
 
-    def __init__(self, index):
+    def __init__(self, index, cache_size: int = 1024, import_dir: str | Path | None = None):
         self.index = index
+        # import_entries only reads files from here, and is off without it
+        self.import_dir = Path(import_dir).resolve() if import_dir else None
+        # searches run in parallel, appends wait for them and run alone
+        self.lock = RWLock()
+        # search results, cleared whenever the index changes
+        self.cache = LRUCache(maxsize=cache_size)
+        self.question_hashes = {
+            question_hash(doc['question'], doc['course']) for doc in index.docs
+        }
 
-    def search(self, query: str) -> List[Dict[str, Any]]:
+    def search(self, query: str, course: str = DEFAULT_COURSE) -> List[Dict[str, Any]]:
         """
         Search the FAQ database for entries matching the given query.
     
         Args:
             query (str): Search query text to look up in the course FAQ.
+            course (str): The course whose FAQ to search, e.g. "data-engineering-zoomcamp",
+                "machine-learning-zoomcamp" or "mlops-zoomcamp".
     
         Returns:
             List[Dict[str, Any]]: A list of search result entries, each containing relevant metadata.
         """
         boost = {'question': 3.0, 'section': 0.5}
     
-        results = self.index.search(
-            query=query,
-            filter_dict={'course': 'data-engineering-zoomcamp'},
-            boost_dict=boost,
-            num_results=5,
-        )
+        with self.lock.read():
+            key = (query, course)
+            results = self.cache.get(key)
+
+            if results is None:
+                results = self.index.search(
+                    query=query,
+                    filter_dict={'course': course},
+                    boost_dict=boost,
+                    num_results=5,
+                )
+                self.cache.put(key, results)
     
-        return results
+        return list(results)
 
-    def add_entry(self, question: str, answer: str) -> None:
+    def add_entry(self, question: str, answer: str, course: str = DEFAULT_COURSE) -> None:
         """
         Add a new entry to the FAQ database.
     
         Args:
             question (str): The question to be added to the FAQ database.
             answer (str): The corresponding answer to the question.
+            course (str): The course the entry belongs to.
+        """
+        doc = self._make_doc(question, answer, course)
+        with self.lock.write():
+            self.index.append(doc)
+            self.question_hashes.add(question_hash(question, course))
+            self.cache.clear()
+
+    def add_entries(self, entries: List[Dict[str, str]]) -> Dict[str, int]:
         """
-        doc = {
+        Add many entries to the FAQ database at once.
+
+        Entries whose question is already in the database (ignoring case
+        and whitespace) are skipped.
+
+        Args:
+            entries (List[Dict[str, str]]): Entries to add, each with "question" and "answer" keys
+                and an optional "course" key.
+
+        Returns:
+            Dict[str, int]: The number of added and skipped entries.
+        """
+        # validate the whole batch first, so a bad entry doesn't leave
+        # hashes behind for documents that never made it into the index
+        for i, entry in enumerate(entries):
+            if not isinstance(entry.get('question'), str) or not isinstance(entry.get('answer'), str):
+                raise ValueError(f'entry {i} needs "question" and "answer" strings')
+
+        with self.lock.write():
+            docs = []
+            hashes = set()
+
+            for entry in entries:
+                course = entry.get('course', DEFAULT_COURSE)
+                h = question_hash(entry['question'], course)
+                if h in self.question_hashes or h in hashes:
+                    continue
+                hashes.add(h)
+                docs.append(self._make_doc(entry['question'], entry['answer'], course))
+
+            if docs:
+                append_many(self.index, docs)
+                self.question_hashes.update(hashes)
+                self.cache.clear()
+
+        return {'added': len(docs), 'skipped': len(entries) - len(docs)}
+
+    def import_entries(self, path: str) -> Dict[str, int]:
+        """
+        Add entries to the FAQ database from a JSONL file in the server's import directory.
+
+        Args:
+            path (str): Path to a JSONL file relative to the import directory, one
+                {"question": ..., "answer": ...} object per line, optionally with "course".
+
+        Returns:
+            Dict[str, int]: The number of added and skipped entries.
+        """
+        return self.add_entries(read_jsonl(self._import_path(path)))
+
+    def _import_path(self, path: str) -> Path:
+        if self.import_dir is None:
+            raise ValueError('importing files is disabled on this server')
+
+        full_path = (self.import_dir / path).resolve()
+        if not full_path.is_relative_to(self.import_dir):
+            raise ValueError(f'{path} is outside of the import directory')
+
+        return full_path
+
+    def _make_doc(self, question: str, answer: str, course: str) -> Dict[str, Any]:
+        return {
             'question': question,
             'text': answer,
             'section': 'user added',
-            'course': 'data-engineering-zoomcamp'
+            'course': course
         }
-        self.index.append(doc)
\ No newline at end of file
+
+
+class AsyncSearchTools:
+    """
+    Async versions of the SearchTools methods for the MCP server.
+
+    The work runs in an executor, so scoring doesn't block the event
+    loop and requests from many clients are served concurrently.
+    """
+
+    def __init__(self, search_tools: SearchTools, executor: Executor | None = None):
+        self.search_tools = search_tools
+        self.executor = executor
+        self.metrics = ToolMetrics()
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        error = False
+
+        try:
+            return await loop.run_in_executor(self.executor, func, *args)
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.metrics.observe(func.__name__, time.perf_counter() - start, error=error)
+
+    async def search(self, query: str, course: str = DEFAULT_COURSE) -> List[Dict[str, Any]]:
+        """
+        Search the FAQ database for entries matching the given query.
+
+        Args:
+            query (str): Search query text to look up in the course FAQ.
+            course (str): The course whose FAQ to search, e.g. "data-engineering-zoomcamp",
+                "machine-learning-zoomcamp" or "mlops-zoomcamp".
+
+        Returns:
+            List[Dict[str, Any]]: A list of search result entries, each containing relevant metadata.
+        """
+        return await self._run(self.search_tools.search, query, course)
+
+    async def add_entry(self, question: str, answer: str, course: str = DEFAULT_COURSE) -> None:
+        """
+        Add a new entry to the FAQ database.
+
+        Args:
+            question (str): The question to be added to the FAQ database.
+            answer (str): The corresponding answer to the question.
+            course (str): The course the entry belongs to.
+        """
+        await self._run(self.search_tools.add_entry, question, answer, course)
+
+    async def add_entries(self, entries: List[Dict[str, str]]) -> Dict[str, int]:
+        """
+        Add many entries to the FAQ database at once.
+
+        Entries whose question is already in the database (ignoring case
+        and whitespace) are skipped.
+
+        Args:
+            entries (List[Dict[str, str]]): Entries to add, each with "question" and "answer" keys
+                and an optional "course" key.
+
+        Returns:
+            Dict[str, int]: The number of added and skipped entries.
+        """
+        return await self._run(self.search_tools.add_entries, entries)
+
+    async def import_entries(self, path: str) -> Dict[str, int]:
+        """
+        Add entries to the FAQ database from a JSONL file in the server's import directory.
+
+        Args:
+            path (str): Path to a JSONL file relative to the import directory, one
+                {"question": ..., "answer": ...} object per line, optionally with "course".
+
+        Returns:
+            Dict[str, int]: The number of added and skipped entries.
+        """
+        return await self._run(self.search_tools.import_entries, path)
+
+    async def stats(self) -> Dict[str, Any]:
+        """
+        Report server statistics: queries per second over the last minute,
+        search cache hit rate, index size, and latency histograms for each tool.
+
+        Returns:
+            Dict[str, Any]: The server statistics.
+        """
+        return self._stats()
+
+    def _stats(self) -> Dict[str, Any]:
+        stats = self.metrics.stats()
+        stats['cache'] = self.search_tools.cache.stats()
+        stats['index_size'] = num_docs(self.search_tools.index)
+        return stats
@@ -0,0 +1,80 @@
+import pytest
+from minsearch import AppendableIndex
+
+from course_index import CourseIndex
+from search_tools import AsyncSearchTools, SearchTools
+
+
+def make_tools(**kwargs):
+    index = AppendableIndex(text_fields=['question', 'text', 'section'], keyword_fields=['course'])
+    index.fit([
+        {'question': 'How do I join the course?', 'text': 'Register on the website.',
+         'section': 'General', 'course': 'data-engineering-zoomcamp'},
+    ])
+    return SearchTools(index, **kwargs)
+
+
+def test_add_entries_skips_known_questions():
+    tools = make_tools()
+
+    result = tools.add_entries([
+        {'question': 'how do I  JOIN the course?', 'answer': 'Again'},
+        {'question': 'Where is the homework?', 'answer': 'In the repo.'},
+        {'question': 'Where is the homework?', 'answer': 'Duplicate in the batch.'},
+    ])
+
+    assert result == {'added': 1, 'skipped': 2}
+    assert len(tools.index.docs) == 2
+    assert tools.search('homework')[0]['text'] == 'In the repo.'
+
+
+def test_add_entries_with_malformed_entry_adds_nothing():
+    tools = make_tools()
+
+    with pytest.raises(ValueError):
+        tools.add_entries([
+            {'question': 'Where is the homework?', 'answer': 'In the repo.'},
+            {'question': 'Is there a certificate?'},
+        ])
+
+    assert len(tools.index.docs) == 1
+
+    # the valid entry isn't remembered as a duplicate after the failed batch
+    result = tools.add_entries([{'question': 'Where is the homework?', 'answer': 'In the repo.'}])
+    assert result == {'added': 1, 'skipped': 0}
+
+
+def test_import_entries_reads_only_from_import_dir(tmp_path):
+    import_dir = tmp_path / 'import'
+    import_dir.mkdir()
+    (import_dir / 'entries.jsonl').write_text('{"question": "Where is the homework?", "answer": "In the repo."}\n')
+    (tmp_path / 'secret.jsonl').write_text('{"question": "secret", "answer": "secret"}\n')
+
+    tools = make_tools(import_dir=import_dir)
+
+    assert tools.import_entries('entries.jsonl') == {'added': 1, 'skipped': 0}
+
+    with pytest.raises(ValueError):
+        tools.import_entries('../secret.jsonl')
+    with pytest.raises(ValueError):
+        tools.import_entries(str(tmp_path / 'secret.jsonl'))
+
+
+def test_import_entries_is_disabled_without_import_dir(tmp_path):
+    path = tmp_path / 'entries.jsonl'
+    path.write_text('{"question": "Where is the homework?", "answer": "In the repo."}\n')
+
+    with pytest.raises(ValueError):
+        make_tools().import_entries(str(path))
+
+
+def test_stats_index_size_of_course_index():
+    index = CourseIndex(text_fields=['question', 'text', 'section'], keyword_fields=['course'])
+    index.fit([
+        {'question': 'How do I join?', 'text': 'Register.', 'section': 'General', 'course': 'data-engineering-zoomcamp'},
+        {'question': 'Which cloud?', 'text': 'Any.', 'section': 'General', 'course': 'mlops-zoomcamp'},
+    ])
+    tools = SearchTools(index)
+    tools.add_entry('Where is the homework?', 'In the repo.', course='mlops-zoomcamp')
+
+    assert AsyncSearchTools(tools)._stats()['index_size'] == 3
@@ -1,3 +1,4 @@
+import os
 import uuid
 
 from typing import Any
@@ -17,8 +18,9 @@ from temporalio.worker import Worker
 
 
 with workflow.unsafe.imports_passed_through():
-    from tools import SearchTools, SummarizationTools
-    from elasticsearch import Elasticsearch
+    from elasticsearch import AsyncElasticsearch
+    from tools import AsyncSearchTools, SummarizationTools, create_async_es_client, extract_queries
+    from summary_cache import SummaryCache
 
 
 class NamedCallback:
@@ -109,11 +111,10 @@ Rules:
 
 
 
-def create_agent() -> Agent:
-    es_client = Elasticsearch("http://localhost:9200")
+def create_agent(es_client: AsyncElasticsearch, compact_context: bool = True) -> Agent:
     index_name = "podcasts"
 
-    search_tools = SearchTools(
+    search_tools = AsyncSearchTools(
         es_client=es_client,
         index_name=index_name
     )
@@ -122,19 +123,35 @@ def create_agent() -> Agent:
 
     summarization_tools = SummarizationTools(
         search_tools=search_tools,
-        summarization_agent=summarization_agent
+        summarization_agent=summarization_agent,
+        map_reduce=True,
+        cache=SummaryCache(os.getenv('SUMMARY_CACHE', 'summaries.db')),
     )
 
     agent = Agent(
         name='research_agent',
         instructions=research_instructions,
         model='openai:gpt-4o-mini',
-        tools=[search_tools.search_videos, summarization_tools.summarize]
+        tools=[
+            search_tools.search_videos,
+            search_tools.search_segments,
+            search_tools.get_subtitles_range,
+            summarization_tools.summarize,
+        ]
     )
 
     class AppRunContext(TemporalRunContext):
         @classmethod
         def serialize_run_context(cls, ctx: RunContext) -> dict:
+            if compact_context:
+                # the tools only need the queries, not the whole conversation
+                # in every activity payload
+                user_queries, search_queries = extract_queries(ctx.messages)
+                return {
+                    'queries': {'user': user_queries, 'search': search_queries},
+                    'retries': {}, # Placeholder for retries
+                }
+
             return {
                 'messages': ctx.messages,
                 'retries': {}, # Placeholder for retries
@@ -154,7 +171,9 @@ def create_agent() -> Agent:
 
 
 
-temporal_agent = create_agent()
+# shared by all tools, closed when the worker stops
+es_client = create_async_es_client("http://localhost:9200")
+temporal_agent = create_agent(es_client, compact_context=os.getenv('COMPACT_RUN_CONTEXT', '1') == '1')
 
 @workflow.defn
 class ResearchWorkflow(PydanticAIWorkflow):  
@@ -176,18 +195,21 @@ async def run():
     
     activities = temporal_agent.temporal_activities
 
-    async with Worker(  
-        client,
-        task_queue='research',
-        workflows=[ResearchWorkflow],
-        activities=activities,
-    ):
-        output = await client.execute_workflow(  
-            ResearchWorkflow.run,
-            args=(prompt, ),
-            id=f'research-{uuid.uuid4()}',
+    try:
+        async with Worker(  
+            client,
             task_queue='research',
-        )
+            workflows=[ResearchWorkflow],
+            activities=activities,
+        ):
+            output = await client.execute_workflow(  
+                ResearchWorkflow.run,
+                args=(prompt, ),
+                id=f'research-{uuid.uuid4()}',
+                task_queue='research',
+            )
+    finally:
+        await es_client.close()
 
     print("FINAL OUTPUT:")
     print(output)
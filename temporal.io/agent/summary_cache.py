@@ -0,0 +1,78 @@
+import json
+import time
+import sqlite3
+import hashlib
+from pathlib import Path
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    key TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def normalize_queries(queries: list[str]) -> list[str]:
+    """Case, whitespace, order and duplicates of the queries don't change the key"""
+    return sorted({' '.join(q.lower().split()) for q in queries if q.strip()})
+
+
+def summary_key(video_id: str, queries: list[str], model: str, settings: dict | None = None) -> str:
+    raw = json.dumps([video_id, normalize_queries(queries), model, settings or {}], sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class SummaryCache:
+    """
+    Summaries in SQLite, keyed by video, query set, model and the
+    summarization settings.
+
+    Entries older than ttl_seconds are ignored and overwritten by the
+    next summary for the same key. The ones nobody asks for again are
+    deleted when the cache is opened.
+    """
+
+    def __init__(self, path: str | Path, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+        self.evict_expired()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, video_id: str, queries: list[str], model: str, settings: dict | None = None) -> str | None:
+        key = summary_key(video_id, queries, model, settings)
+
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT summary FROM summaries WHERE key = ? AND created_at >= ?',
+                (key, time.time() - self.ttl_seconds),
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def put(self, video_id: str, queries: list[str], model: str, summary: str, settings: dict | None = None) -> None:
+        key = summary_key(video_id, queries, model, settings)
+
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO summaries (key, video_id, summary, created_at) VALUES (?, ?, ?, ?)',
+                (key, video_id, summary, time.time()),
+            )
+
+    def evict_expired(self) -> int:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'DELETE FROM summaries WHERE created_at < ?',
+                (time.time() - self.ttl_seconds,),
+            )
+            return cursor.rowcount
@@ -1,15 +1,170 @@
+import re
 import json
+import asyncio
 import textwrap
 
-from pydantic_ai import Agent, RunContext
-from elasticsearch import Elasticsearch
+from pydantic_ai import Agent, ModelRetry, RunContext
+from elasticsearch import Elasticsearch, AsyncElasticsearch
+
+from summary_cache import SummaryCache
+
+
+# get_subtitles_by_id returns only these, even if the documents get more fields
+VIDEO_SOURCE_FIELDS = ["video_id", "title", "subtitles"]
+
+
+# a copy of ../flow/timestamps.py: the agent is a separate project, keep them in sync
+def format_timestamp(seconds: float) -> str:
+    """Convert seconds to H:MM:SS if > 1 hour, else M:SS"""
+    total_seconds = int(seconds)
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+
+    if hours == 0:
+        return f"{minutes}:{secs:02}"
+    return f"{hours}:{minutes:02}:{secs:02}"
+
+
+def parse_timestamp(ts: str) -> int:
+    """Convert H:MM:SS or M:SS to seconds"""
+    seconds = 0
+    for part in ts.strip().split(':'):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def select_subtitle_lines(subtitles: str, start: int, end: int) -> str:
+    """Keep the "M:SS text" subtitle lines with timestamps between start and end seconds"""
+    lines = []
+
+    for line in subtitles.splitlines():
+        ts, _, _ = line.partition(' ')
+        try:
+            seconds = parse_timestamp(ts)
+        except ValueError:
+            continue
+
+        if seconds > end:
+            break
+        if seconds >= start:
+            lines.append(line)
+
+    return '\n'.join(lines)
+
+
+def search_videos_body(query: str, size: int) -> dict:
+    return {
+        "size": size,
+        # the highlights are all we return, don't send the transcripts back
+        "_source": False,
+        "query": {
+            "multi_match": {
+                "query": query,
+                "fields": ["title^3", "subtitles"],
+                "type": "best_fields",
+                "analyzer": "english_with_stop_and_stem"
+            }
+        },
+        "highlight": {
+            "pre_tags": ["*"],
+            "post_tags": ["*"],
+            "fields": {
+                "title": {
+                    "fragment_size": 150,
+                    "number_of_fragments": 1
+                },
+                "subtitles": {
+                    "fragment_size": 150,
+                    "number_of_fragments": 1
+                }
+            }
+        }
+    }
+
+
+def parse_video_hits(hits: list[dict]) -> list[dict]:
+    results = []
+    for hit in hits:
+        highlight = hit['highlight']
+        highlight['video_id'] = hit['_id']
+        results.append(highlight)
+
+    return results
+
+
+def search_segments_body(query: str, size: int) -> dict:
+    return {
+        "size": size,
+        "_source": ["video_id", "title", "start", "end", "text"],
+        "query": {
+            "multi_match": {
+                "query": query,
+                "fields": ["title^3", "text"],
+                "type": "best_fields",
+                "analyzer": "english_with_stop_and_stem"
+            }
+        }
+    }
+
+
+def parse_segment_hits(hits: list[dict]) -> list[dict]:
+    results = []
+    for hit in hits:
+        source = hit['_source']
+        results.append({
+            'video_id': source['video_id'],
+            'title': source['title'],
+            'start': format_timestamp(source['start']),
+            'end': format_timestamp(source['end']),
+            'text': source['text'],
+        })
+
+    return results
+
+
+def subtitles_range(video_id: str, source: dict, timestamp: str, window_seconds: int) -> dict:
+    try:
+        seconds = parse_timestamp(timestamp)
+    except ValueError:
+        # the model gets the message and can call the tool again
+        raise ModelRetry(f'invalid timestamp {timestamp!r}, expected "m:ss" or "h:mm:ss", e.g. "12:05"')
+
+    start = max(0, seconds - window_seconds)
+    end = seconds + window_seconds
+
+    return {
+        'video_id': video_id,
+        'title': source['title'],
+        'start': format_timestamp(start),
+        'end': format_timestamp(end),
+        'subtitles': select_subtitle_lines(source['subtitles'], start, end),
+    }
+
+
+def create_async_es_client(
+    address: str = "http://localhost:9200",
+    request_timeout: float = 10,
+    max_connections: int = 10,
+) -> AsyncElasticsearch:
+    """
+    One client for all tools, so parallel tool calls share its connection pool
+    instead of opening connections of their own.
+    """
+    return AsyncElasticsearch(
+        address,
+        request_timeout=request_timeout,
+        connections_per_node=max_connections,
+        retry_on_timeout=True,
+        max_retries=2,
+    )
 
 
 class SearchTools:
 
-    def __init__(self, es_client: Elasticsearch, index_name: str):
+    def __init__(self, es_client: Elasticsearch, index_name: str, chunks_index_name: str = "podcast-chunks"):
         self.es_client = es_client
         self.index_name = index_name
+        self.chunks_index_name = chunks_index_name
 
     def search_videos(self, query: str, size: int = 5) -> list[dict]:
         """
@@ -21,42 +176,23 @@ class SearchTools:
             query (str): The search query string to match against video titles and subtitles. Must be a non-empty string.
             size (int, optional): Maximum number of results to return. Must be a positive integer. Defaults to 5.
         """
-        body = {
-            "size": size,
-            "query": {
-                "multi_match": {
-                    "query": query,
-                    "fields": ["title^3", "subtitles"],
-                    "type": "best_fields",
-                    "analyzer": "english_with_stop_and_stem"
-                }
-            },
-            "highlight": {
-                "pre_tags": ["*"],
-                "post_tags": ["*"],
-                "fields": {
-                    "title": {
-                        "fragment_size": 150,
-                        "number_of_fragments": 1
-                    },
-                    "subtitles": {
-                        "fragment_size": 150,
-                        "number_of_fragments": 1
-                    }
-                }
-            }
-        }
-
+        body = search_videos_body(query, size)
         response = self.es_client.search(index=self.index_name, body=body)
-        hits = response.body['hits']['hits']
+        return parse_video_hits(response.body['hits']['hits'])
 
-        results = []
-        for hit in hits:
-            highlight = hit['highlight']
-            highlight['video_id'] = hit['_id']
-            results.append(highlight)
+    def search_segments(self, query: str, size: int = 5) -> list[dict]:
+        """
+        Search for transcript segments (about a minute each) that match a given query.
+
+        Returns the video ID, title, start and end timestamps and the text of each segment.
 
-        return results
+        Args:
+            query (str): The search query string to match against video titles and transcript segments. Must be a non-empty string.
+            size (int, optional): Maximum number of segments to return. Must be a positive integer. Defaults to 5.
+        """
+        body = search_segments_body(query, size)
+        response = self.es_client.search(index=self.chunks_index_name, body=body)
+        return parse_segment_hits(response.body['hits']['hits'])
 
     def get_subtitles_by_id(self, video_id: str) -> dict:
         """
@@ -65,39 +201,265 @@ class SearchTools:
         Args:
             video_id (str): the YouTube video id for which we want to get the subtitles
         """
-        result = self.es_client.get(index=self.index_name, id=video_id)
+        result = self.es_client.get(index=self.index_name, id=video_id, source_includes=VIDEO_SOURCE_FIELDS)
+        return result['_source']
+
+    def get_subtitles_range(self, video_id: str, timestamp: str, window_seconds: int = 60) -> dict:
+        """
+        Retrieve only the subtitle lines around a timestamp of a video, instead of the full transcript.
+
+        Args:
+            video_id (str): the YouTube video id
+            timestamp (str): the timestamp to look around, "m:ss" or "h:mm:ss", for example from a search result
+            window_seconds (int, optional): how many seconds before and after the timestamp to return. Defaults to 60.
+        """
+        result = self.es_client.get(index=self.index_name, id=video_id, source_includes=["title", "subtitles"])
+        return subtitles_range(video_id, result['_source'], timestamp, window_seconds)
+
+
+class AsyncSearchTools:
+    """
+    SearchTools on AsyncElasticsearch.
+
+    The agent runs tools in its event loop, where the synchronous
+    client blocks the loop, so parallel tool calls run one by one.
+    """
+
+    def __init__(self, es_client: AsyncElasticsearch, index_name: str, chunks_index_name: str = "podcast-chunks"):
+        self.es_client = es_client
+        self.index_name = index_name
+        self.chunks_index_name = chunks_index_name
+
+    async def search_videos(self, query: str, size: int = 5) -> list[dict]:
+        """
+        Search for videos whose titles or subtitles match a given query.
+
+        Returns highlighted match information including video IDs and snippets.
+
+        Args:
+            query (str): The search query string to match against video titles and subtitles. Must be a non-empty string.
+            size (int, optional): Maximum number of results to return. Must be a positive integer. Defaults to 5.
+        """
+        body = search_videos_body(query, size)
+        response = await self.es_client.search(index=self.index_name, body=body)
+        return parse_video_hits(response.body['hits']['hits'])
+
+    async def search_segments(self, query: str, size: int = 5) -> list[dict]:
+        """
+        Search for transcript segments (about a minute each) that match a given query.
+
+        Returns the video ID, title, start and end timestamps and the text of each segment.
+
+        Args:
+            query (str): The search query string to match against video titles and transcript segments. Must be a non-empty string.
+            size (int, optional): Maximum number of segments to return. Must be a positive integer. Defaults to 5.
+        """
+        body = search_segments_body(query, size)
+        response = await self.es_client.search(index=self.chunks_index_name, body=body)
+        return parse_segment_hits(response.body['hits']['hits'])
+
+    async def get_subtitles_by_id(self, video_id: str) -> dict:
+        """
+        Retrieve the full subtitle content for a specific video.
+
+        Args:
+            video_id (str): the YouTube video id for which we want to get the subtitles
+        """
+        result = await self.es_client.get(index=self.index_name, id=video_id, source_includes=VIDEO_SOURCE_FIELDS)
         return result['_source']
 
+    async def get_subtitles_range(self, video_id: str, timestamp: str, window_seconds: int = 60) -> dict:
+        """
+        Retrieve only the subtitle lines around a timestamp of a video, instead of the full transcript.
+
+        Args:
+            video_id (str): the YouTube video id
+            timestamp (str): the timestamp to look around, "m:ss" or "h:mm:ss", for example from a search result
+            window_seconds (int, optional): how many seconds before and after the timestamp to return. Defaults to 60.
+        """
+        result = await self.es_client.get(index=self.index_name, id=video_id, source_includes=["title", "subtitles"])
+        return subtitles_range(video_id, result['_source'], timestamp, window_seconds)
+
+
+class ThreadedSearchTools:
+    """
+    SearchTools behind the AsyncSearchTools interface: each call runs
+    in a thread, so the synchronous client doesn't block the event loop.
+    """
+
+    def __init__(self, search_tools: SearchTools):
+        self.search_tools = search_tools
+
+    async def search_videos(self, query: str, size: int = 5) -> list[dict]:
+        return await asyncio.to_thread(self.search_tools.search_videos, query, size)
+
+    async def search_segments(self, query: str, size: int = 5) -> list[dict]:
+        return await asyncio.to_thread(self.search_tools.search_segments, query, size)
+
+    async def get_subtitles_by_id(self, video_id: str) -> dict:
+        return await asyncio.to_thread(self.search_tools.get_subtitles_by_id, video_id)
+
+    async def get_subtitles_range(self, video_id: str, timestamp: str, window_seconds: int = 60) -> dict:
+        return await asyncio.to_thread(self.search_tools.get_subtitles_range, video_id, timestamp, window_seconds)
+
+
+def extract_queries(messages) -> tuple[list[str], list[str]]:
+    """The user prompts and the search tool queries from the conversation"""
+    user_queries = []
+    search_queries = []
+
+    for m in messages:
+        for p in m.parts:
+            kind = p.part_kind
+            if kind == 'user-prompt':
+                user_queries.append(p.content)
+            if kind == 'tool-call':
+                if p.tool_name in ('search_videos', 'search_segments'):
+                    args = p.args
+                    if isinstance(args, str):
+                        args = json.loads(args)
+                    search_queries.append(args['query'])
+
+    return user_queries, search_queries
+
+
+QUERY_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "get", "how", "i", "in", "is", "it", "me", "my", "of", "on", "or",
+    "should", "the", "to", "what", "when", "where", "which", "who", "why", "with",
+    "you", "your",
+}
+
+
+def query_terms(queries: list[str]) -> set[str]:
+    terms = set()
+    for query in queries:
+        terms.update(re.findall(r"\w+", query.lower()))
+    return terms - QUERY_STOPWORDS
+
+
+def split_subtitle_windows(subtitles: str, window_seconds: int) -> list[dict]:
+    """Split "M:SS text" subtitle lines into windows of window_seconds"""
+    windows = {}
+
+    for line in subtitles.splitlines():
+        ts, _, _ = line.partition(' ')
+        try:
+            seconds = parse_timestamp(ts)
+        except ValueError:
+            continue
+        windows.setdefault(seconds // window_seconds, []).append(line)
+
+    return [
+        {
+            'start': format_timestamp(i * window_seconds),
+            'end': format_timestamp((i + 1) * window_seconds),
+            'subtitles': '\n'.join(lines),
+        }
+        for i, lines in sorted(windows.items())
+    ]
+
+
+def select_windows(windows: list[dict], terms: set[str], max_windows: int) -> list[dict]:
+    """
+    Keep the max_windows windows that mention the query terms most, in
+    their original order. Windows without any of the terms are dropped,
+    unless no window has them.
+    """
+    scores = []
+    for i, window in enumerate(windows):
+        words = re.findall(r"\w+", window['subtitles'].lower())
+        scores.append((sum(1 for w in words if w in terms), i))
+
+    relevant = [(score, i) for score, i in scores if score > 0] or scores
+    best = sorted(relevant, key=lambda s: (-s[0], s[1]))[:max_windows]
+
+    return [windows[i] for _, i in sorted(best, key=lambda s: s[1])]
+
 
 class SummarizationTools:
 
     def __init__(self,
-        search_tools: SearchTools,
-        summarization_agent: Agent
+        search_tools: AsyncSearchTools | ThreadedSearchTools | SearchTools,
+        summarization_agent: Agent,
+        map_reduce: bool = False,
+        window_seconds: int = 300,
+        max_windows: int = 8,
+        max_concurrency: int = 4,
+        cache: SummaryCache | None = None,
     ):
+        """
+        With map_reduce, long transcripts are split into windows of
+        window_seconds. The max_windows windows most relevant to the
+        queries are summarized in parallel (max_concurrency at a time),
+        and the partial summaries are combined into one.
+
+        With cache, a summary of the same video for the same queries
+        and model is reused instead of running the agent again.
+
+        Subtitles are fetched with the async interface, so SearchTools
+        are wrapped into ThreadedSearchTools.
+        """
+        if isinstance(search_tools, SearchTools):
+            search_tools = ThreadedSearchTools(search_tools)
+
         self.search_tools = search_tools
         self.summarization_agent = summarization_agent
+        self.map_reduce = map_reduce
+        self.window_seconds = window_seconds
+        self.max_windows = max_windows
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+
+    def cache_settings(self) -> dict:
+        # the settings that change the summary, so they are part of the cache key
+        if not self.map_reduce:
+            return {'map_reduce': False}
+        return {'map_reduce': True, 'window_seconds': self.window_seconds, 'max_windows': self.max_windows}
+
+    def model_name(self) -> str:
+        model = self.summarization_agent.model
+        if isinstance(model, str):
+            return model
+        return f"{model.system}:{model.model_name}"
 
     async def summarize(self, ctx: RunContext, video_id: str) -> str:
         """
         Generate a summary for a video based on the conversation history,
         search queries, and the video's subtitles.
         """
-        user_queries = []
-        search_queries = []
+        # a compact run context carries only the queries, not the messages
+        queries = getattr(ctx, 'queries', None)
+        if queries is not None:
+            user_queries = queries['user']
+            search_queries = queries['search']
+        else:
+            user_queries, search_queries = extract_queries(ctx.messages)
+
+        if self.cache is None:
+            return await self.summarize_video(video_id, user_queries, search_queries)
+
+        # tools run in activities, so the cache doesn't affect workflow determinism
+        queries = user_queries + search_queries
+        model = self.model_name()
+        settings = self.cache_settings()
+
+        summary = await asyncio.to_thread(self.cache.get, video_id, queries, model, settings)
+        if summary is not None:
+            return summary
 
-        for m in ctx.messages:
-            for p in m.parts:
-                kind = p.part_kind
-                if kind == 'user-prompt':
-                    user_queries.append(p.content)
-                if kind == 'tool-call':
-                    if p.tool_name == 'search_videos':
-                        args = json.loads(p.args)
-                        query = args['query']
-                        search_queries.append(query)
+        summary = await self.summarize_video(video_id, user_queries, search_queries)
+        await asyncio.to_thread(self.cache.put, video_id, queries, model, summary, settings)
+        return summary
 
-        subtitles = self.search_tools.get_subtitles_by_id(video_id)['subtitles']
+    async def summarize_video(self, video_id: str, user_queries: list[str], search_queries: list[str]) -> str:
+        video = await self.search_tools.get_subtitles_by_id(video_id)
+        subtitles = video['subtitles']
+
+        if self.map_reduce:
+            windows = split_subtitle_windows(subtitles, self.window_seconds)
+            if len(windows) > 1:
+                return await self.summarize_windows(user_queries, search_queries, windows)
 
         prompt = textwrap.dedent(f"""
             user query:
@@ -113,3 +475,29 @@ class SummarizationTools:
         summary_result = await self.summarization_agent.run(prompt) 
         return summary_result.output
 
+    async def summarize_windows(self, user_queries: list[str], search_queries: list[str], windows: list[dict]) -> str:
+        terms = query_terms(user_queries + search_queries)
+        selected = select_windows(windows, terms, self.max_windows)
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def summarize_window(window):
+            prompt = "\n\n".join([
+                "user query:\n" + "\n".join(user_queries),
+                "search engine queries:\n" + "\n".join(search_queries),
+                f"subtitles ({window['start']} - {window['end']}):\n" + window['subtitles'],
+            ])
+            async with semaphore:
+                result = await self.summarization_agent.run(prompt)
+            return f"{window['start']} - {window['end']}:\n{result.output}"
+
+        partial_summaries = await asyncio.gather(*(summarize_window(w) for w in selected))
+
+        prompt = "\n\n".join([
+            "user query:\n" + "\n".join(user_queries),
+            "search engine queries:\n" + "\n".join(search_queries),
+            "summaries of parts of the transcript, combine them into one summary:\n" + "\n\n".join(partial_summaries),
+        ])
+
+        summary_result = await self.summarization_agent.run(prompt)
+        return summary_result.output
@@ -1,13 +1,24 @@
 import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from datetime import timedelta
 
 import yaml
 import requests
+from requests.adapters import HTTPAdapter
 
-from elasticsearch import Elasticsearch
-from youtube_transcript_api import YouTubeTranscriptApi
+from elasticsearch import AsyncElasticsearch, helpers
+from youtube_transcript_api import YouTubeTranscriptApi, RequestBlocked
 from youtube_transcript_api.proxies import GenericProxyConfig
 
 from temporalio import activity
+from temporalio.exceptions import ApplicationError
+
+from rate_limit import AdaptiveRateLimiter, RateLimited
+from timestamps import format_timestamp
+from transcript_cache import TranscriptCache, DEFAULT_LANGUAGE
 
 
 def cteate_proxy_config():
@@ -23,75 +34,285 @@ def cteate_proxy_config():
     )
 
 
-def format_timestamp(seconds: float) -> str:
-    """Convert seconds to H:MM:SS if > 1 hour, else M:SS"""
-    total_seconds = int(seconds)
-    hours, remainder = divmod(total_seconds, 3600)
-    minutes, secs = divmod(remainder, 60)
-
-    if hours == 0:
-        return f"{minutes}:{secs:02}"
-    return f"{hours}:{minutes:02}:{secs:02}"
-
-
 def make_subtitles(transcript) -> str:
     lines = []
 
     for entry in transcript:
-        ts = format_timestamp(entry.start)
-        text = entry.text.replace('\n', ' ')
+        ts = format_timestamp(entry['start'])
+        text = entry['text'].replace('\n', ' ')
         lines.append(ts + ' ' + text)
 
     return '\n'.join(lines)
 
 
+def make_chunks(transcript, chunk_seconds: int = 60) -> list[dict]:
+    """Group transcript snippets into segments of about chunk_seconds with start and end times"""
+    chunks = []
+    current = []
+
+    for entry in transcript:
+        if current and entry['start'] >= current[0]['start'] + chunk_seconds:
+            chunks.append(current)
+            current = []
+        current.append(entry)
+
+    if current:
+        chunks.append(current)
+
+    return [
+        {
+            "start": snippets[0]['start'],
+            "end": snippets[-1]['start'] + snippets[-1]['duration'],
+            "text": ' '.join(s['text'].replace('\n', ' ') for s in snippets),
+        }
+        for snippets in chunks
+    ]
+
+
+def chunk_id(video_id, i) -> str:
+    return f"{video_id}-{i}"
+
+
+def chunks_done_id(video_id) -> str:
+    """Id of the marker document written after all chunks of a video are indexed"""
+    return f"{video_id}-done"
+
+
+def make_video_doc(video, subtitles) -> dict:
+    return {
+        "video_id": video['video_id'],
+        "title": video['title'],
+        "subtitles": subtitles
+    }
+
+
 class YouTubeActivities: 
-    def __init__(self, use_proxy: bool = True):
+    def __init__(
+        self,
+        use_proxy: bool = True,
+        requests_per_second: float = 1.0,
+        pool_size: int = 10,
+        cache: TranscriptCache | None = None,
+        language: str = DEFAULT_LANGUAGE,
+        max_wait: float | None = 10.0,
+    ):
         if use_proxy:
             self.proxy_config = cteate_proxy_config()
         else:
             self.proxy_config = None
 
+        self.pool_size = pool_size
+        # shared by all activity threads, so together they stay under the limit
+        self.rate_limiter = AdaptiveRateLimiter(max_rate=requests_per_second)
+        # fetches have a 1 minute timeout, so longer waits are left to Temporal
+        self.max_wait = max_wait
+        self.local = threading.local()
+
+        self.cache = cache
+        self.language = language
+
+    def get_api(self) -> YouTubeTranscriptApi:
+        # YouTubeTranscriptApi isn't thread-safe, so each activity thread
+        # keeps its own instance, reusing its connections between videos
+        if not hasattr(self.local, 'api'):
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self.local.api = YouTubeTranscriptApi(proxy_config=self.proxy_config, http_client=session)
+        return self.local.api
+
+    def fetch_transcript(self, video_id) -> list[dict]:
+        if self.cache is not None:
+            snippets = self.cache.get(video_id, self.language)
+            if snippets is not None:
+                return snippets
+
+        try:
+            self.rate_limiter.acquire(max_wait=self.max_wait)
+        except RateLimited as e:
+            raise ApplicationError(
+                f'rate limited, fetching {video_id} later',
+                next_retry_delay=timedelta(seconds=e.retry_after),
+            ) from e
+
+        try:
+            transcript = self.get_api().fetch(video_id, languages=[self.language])
+        except RequestBlocked as e:
+            # 429 or bot detection: slow down all fetches and let Temporal
+            # retry this one after the backoff instead of sleeping here
+            backoff = self.rate_limiter.on_throttled()
+            raise ApplicationError(
+                f'YouTube blocked the request for {video_id}',
+                next_retry_delay=timedelta(seconds=backoff),
+            ) from e
+
+        self.rate_limiter.on_success()
+        snippets = transcript.to_raw_data()
+
+        if self.cache is not None:
+            self.cache.put(video_id, snippets, self.language)
+
+        return snippets
 
     @activity.defn
     def fetch_subtitles(self, video_id):
-        ytt_api = YouTubeTranscriptApi(proxy_config=self.proxy_config)
-        transcript = ytt_api.fetch(video_id)
+        transcript = self.fetch_transcript(video_id)
         subtitles = make_subtitles(transcript)
         return subtitles
 
+    @activity.defn
+    def fetch_chunks(self, video_id, chunk_seconds=60):
+        transcript = self.fetch_transcript(video_id)
+        return make_chunks(transcript, chunk_seconds)
+
 
 class ElasticsearchActivities:
+    """
+    Async activities: they run in the worker's event loop and share the
+    connection pool of one AsyncElasticsearch client, without a thread
+    per request.
+    """
 
-    def __init__(self, es_address: str = None):
+    def __init__(self, es_address: str = None, pool_size: int = 10, request_timeout: float = 30):
         if es_address is None:
             es_address = os.getenv('ELASTICSEARCH_ADDRESS', 'http://localhost:9200')
-        self.es = Elasticsearch(es_address)
+        self.es = AsyncElasticsearch(
+            es_address,
+            connections_per_node=pool_size,
+            request_timeout=request_timeout,
+        )
 
     @activity.defn
-    def video_exists(self, video_id):
-        resp = self.es.exists(index="podcasts", id=video_id)
+    async def video_exists(self, video_id):
+        resp = await self.es.exists(index="podcasts", id=video_id)
         return resp.body
 
+    async def find_missing_ids(self, index, ids, batch_size=1000):
+        missing = []
+
+        for i in range(0, len(ids), batch_size):
+            batch = ids[i:i + batch_size]
+            resp = await self.es.mget(index=index, ids=batch, source=False)
+            missing.extend(doc['_id'] for doc in resp['docs'] if not doc.get('found'))
+
+        return missing
+
+    @activity.defn
+    async def find_missing_videos(self, video_ids, batch_size=1000):
+        """Return the ids from video_ids that aren't indexed yet, with one mget per batch"""
+        return await self.find_missing_ids("podcasts", video_ids, batch_size)
+
+    @activity.defn
+    async def find_missing_chunked_videos(self, video_ids, batch_size=1000):
+        """Same as find_missing_videos, for the chunks index: a video is indexed if its marker document is"""
+        markers = {chunks_done_id(video_id): video_id for video_id in video_ids}
+        missing = await self.find_missing_ids("podcast-chunks", list(markers), batch_size)
+        return [markers[_id] for _id in missing]
+
     @activity.defn
-    def index_video(self, video, subtitles):
+    async def index_video(self, video, subtitles):
         video_id = video['video_id']
-        video_title = video['title']
-        
-        doc = {
-            "video_id": video_id,
-            "title": video_title,
-            "subtitles": subtitles
-        }
+        doc = make_video_doc(video, subtitles)
+        await self.es.index(index="podcasts", id=video_id, document=doc)
 
-        self.es.index(index="podcasts", id=video_id, document=doc)
+    @activity.defn
+    async def index_video_chunks(self, video, chunks):
+        """
+        Index the chunks of one video as separate documents, returns the number of chunks.
+
+        After all chunks are in, a marker document with the number of
+        chunks is written, also for transcripts without any chunks. If
+        some chunks fail, the activity fails before the marker, and the
+        retry indexes all of them again under the same ids.
+        """
+        video_id = video['video_id']
 
+        actions = (
+            {
+                "_index": "podcast-chunks",
+                "_id": chunk_id(video_id, i),
+                "_source": {
+                    "video_id": video_id,
+                    "title": video['title'],
+                    **chunk,
+                },
+            }
+            for i, chunk in enumerate(chunks)
+        )
 
-@activity.defn
-def find_podcast_videos(commit_id):
-    events_url = f'https://raw.githubusercontent.com/DataTalksClub/datatalksclub.github.io/{commit_id}/_data/events.yaml'
+        indexed, errors = await helpers.async_bulk(self.es, actions, max_retries=3, raise_on_error=False)
+        if errors:
+            raise ApplicationError(f'{len(errors)} of {len(chunks)} chunks of {video_id} failed: {errors[:3]}')
 
-    raw_yaml = requests.get(events_url).content
+        marker = {"video_id": video_id, "num_chunks": len(chunks)}
+        await self.es.index(index="podcast-chunks", id=chunks_done_id(video_id), document=marker)
+
+        return indexed
+
+    @activity.defn
+    async def index_videos(self, items, chunk_size=500, max_chunk_bytes=10 * 1024 * 1024):
+        """
+        Index a batch of {"video": ..., "subtitles": ...} items with the bulk API.
+
+        Returns the number of indexed documents and the errors for the
+        documents that failed, so one bad document doesn't fail the batch.
+        """
+        actions = (
+            {
+                "_index": "podcasts",
+                "_id": item['video']['video_id'],
+                "_source": make_video_doc(item['video'], item['subtitles']),
+            }
+            for item in items
+        )
+
+        indexed = 0
+        errors = []
+
+        async for ok, result in helpers.async_streaming_bulk(
+            self.es,
+            actions,
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            raise_on_error=False,
+            raise_on_exception=False,
+            max_retries=3,
+        ):
+            if ok:
+                indexed += 1
+                continue
+
+            op_result = next(iter(result.values()))
+            errors.append({
+                'video_id': op_result.get('_id'),
+                'error': str(op_result.get('error')),
+            })
+
+        return {'indexed': indexed, 'errors': errors}
+
+    @activity.defn
+    async def disable_refresh(self):
+        """Turn off index refresh for a backfill, returns the previous refresh_interval"""
+        settings = await self.es.indices.get_settings(index="podcasts", name="index.refresh_interval")
+        previous = settings["podcasts"]["settings"].get("index", {}).get("refresh_interval")
+
+        # already off: a retry of this activity or another backfill turned it
+        # off, so the real previous value is unknown and we restore the default
+        if previous == "-1":
+            previous = None
+
+        await self.es.indices.put_settings(index="podcasts", settings={"index": {"refresh_interval": "-1"}})
+        return previous
+
+    @activity.defn
+    async def restore_refresh(self, refresh_interval=None):
+        # None resets the setting to the default
+        await self.es.indices.put_settings(index="podcasts", settings={"index": {"refresh_interval": refresh_interval}})
+        await self.es.indices.refresh(index="podcasts")
+
+
+def parse_podcast_videos(raw_yaml) -> list[dict]:
     events_data = yaml.load(raw_yaml, yaml.CSafeLoader)
 
     podcasts = [d for d in events_data if (d.get('type') == 'podcast') and (d.get('youtube'))]
@@ -115,3 +336,77 @@ def find_podcast_videos(commit_id):
     print(f"Will process {len(videos)} videos")
     return videos
 
+
+@activity.defn
+def find_podcast_videos(commit_id):
+    events_url = f'https://raw.githubusercontent.com/DataTalksClub/datatalksclub.github.io/{commit_id}/_data/events.yaml'
+
+    raw_yaml = requests.get(events_url).content
+    return parse_podcast_videos(raw_yaml)
+
+
+def video_fingerprint(video) -> str:
+    raw = json.dumps(video, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()
+
+
+class DiscoveryActivities:
+    """
+    Incremental podcast discovery.
+
+    A JSON file on the worker keeps the last processed commit and a
+    fingerprint of every processed video, so a run only gets the
+    videos that were added or changed since then.
+    """
+
+    def __init__(self, state_path: str = None):
+        if state_path is None:
+            state_path = os.getenv('DISCOVERY_STATE', 'discovery_state.json')
+        self.state_path = Path(state_path)
+
+    def load_state(self) -> dict:
+        if not self.state_path.exists():
+            return {'commit_id': None, 'videos': {}}
+        return json.loads(self.state_path.read_text(encoding='utf-8'))
+
+    @activity.defn
+    def find_changed_podcast_videos(self, commit_id):
+        """Return {"added": [...], "changed": [...]} videos since the last processed commit"""
+        state = self.load_state()
+
+        if state['commit_id'] == commit_id:
+            return {'added': [], 'changed': []}
+
+        added = []
+        changed = []
+
+        for video in find_podcast_videos(commit_id):
+            fingerprint = state['videos'].get(video['video_id'])
+            if fingerprint is None:
+                added.append(video)
+            elif fingerprint != video_fingerprint(video):
+                changed.append(video)
+
+        return {'added': added, 'changed': changed}
+
+    @activity.defn
+    def save_discovery_state(self, commit_id, videos, failed_ids=()):
+        """
+        Remember the processed videos, and the commit once all its videos are processed.
+
+        Failed videos aren't remembered, so the next run returns them
+        again, even for the same commit.
+        """
+        state = self.load_state()
+
+        failed_ids = set(failed_ids)
+        for video in videos:
+            if video['video_id'] not in failed_ids:
+                state['videos'][video['video_id']] = video_fingerprint(video)
+
+        if not failed_ids:
+            state['commit_id'] = commit_id
+
+        tmp_path = self.state_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(state, indent=2), encoding='utf-8')
+        os.replace(tmp_path, self.state_path)
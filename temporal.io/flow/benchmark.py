@@ -0,0 +1,268 @@
+"""
+Offline benchmark of the podcast transcript pipeline.
+
+Runs PodcastTranscriptWorkflow on the Temporal test server with local
+stand-ins instead of GitHub, YouTube and Elasticsearch, and reports
+the throughput for each combination of concurrency and batch size:
+
+    uv run python benchmark.py --videos 200 --concurrency 1 4 16 --batch-size 0 20
+    uv run python benchmark.py --fetch-latency 1.0 --transcript-minutes 90 --chunk-seconds 60
+
+The first run downloads the test server.
+"""
+
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import itertools
+from dataclasses import dataclass, asdict
+
+from temporalio import activity
+from temporalio.client import Client
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Worker
+
+from activities import chunk_id, chunks_done_id, make_chunks, make_subtitles
+from codec import create_data_converter
+from workflow import PipelineOptions, PodcastTranscriptWorkflow, TASK_QUEUE, YOUTUBE_TASK_QUEUE
+
+
+WORDS = (
+    'data engineering machine learning model pipeline career startup '
+    'python sql cloud team project product analytics interview skills '
+    'community experience freelance manager mlops deployment feature'
+).split()
+
+
+def synthetic_transcript(video_id: str, minutes: int) -> list[dict]:
+    """A snippet of 4-8 words every 3 seconds, about as long as a real transcript"""
+    rng = random.Random(video_id)
+
+    return [
+        {'text': ' '.join(rng.choices(WORDS, k=rng.randint(4, 8))), 'start': float(start), 'duration': 3.0}
+        for start in range(0, minutes * 60, 3)
+    ]
+
+
+class FakeYouTubeActivities:
+    """fetch_subtitles and fetch_chunks with synthetic transcripts and a fixed latency"""
+
+    def __init__(self, latency: float, minutes: int):
+        self.latency = latency
+        self.minutes = minutes
+
+    @activity.defn
+    async def fetch_subtitles(self, video_id):
+        await asyncio.sleep(self.latency)
+        return make_subtitles(synthetic_transcript(video_id, self.minutes))
+
+    @activity.defn
+    async def fetch_chunks(self, video_id, chunk_seconds=60):
+        await asyncio.sleep(self.latency)
+        return make_chunks(synthetic_transcript(video_id, self.minutes), chunk_seconds)
+
+
+class InMemoryElasticsearchActivities:
+    """The Elasticsearch activities on dicts, with a fixed latency per request"""
+
+    def __init__(self, latency: float, indexed_ids=()):
+        self.latency = latency
+        self.indexes = {"podcasts": {}, "podcast-chunks": {}}
+        for video_id in indexed_ids:
+            self.indexes["podcasts"][video_id] = {}
+            self.indexes["podcast-chunks"][chunks_done_id(video_id)] = {}
+
+    async def request(self):
+        await asyncio.sleep(self.latency)
+
+    @activity.defn
+    async def video_exists(self, video_id):
+        await self.request()
+        return video_id in self.indexes["podcasts"]
+
+    @activity.defn
+    async def find_missing_videos(self, video_ids, batch_size=1000):
+        await self.request()
+        return [v for v in video_ids if v not in self.indexes["podcasts"]]
+
+    @activity.defn
+    async def find_missing_chunked_videos(self, video_ids, batch_size=1000):
+        await self.request()
+        return [v for v in video_ids if chunks_done_id(v) not in self.indexes["podcast-chunks"]]
+
+    @activity.defn
+    async def index_video(self, video, subtitles):
+        await self.request()
+        self.indexes["podcasts"][video['video_id']] = {**video, "subtitles": subtitles}
+
+    @activity.defn
+    async def index_videos(self, items, chunk_size=500, max_chunk_bytes=10 * 1024 * 1024):
+        await self.request()
+        for item in items:
+            self.indexes["podcasts"][item['video']['video_id']] = {**item['video'], "subtitles": item['subtitles']}
+        return {'indexed': len(items), 'errors': []}
+
+    @activity.defn
+    async def index_video_chunks(self, video, chunks):
+        await self.request()
+        for i, chunk in enumerate(chunks):
+            self.indexes["podcast-chunks"][chunk_id(video['video_id'], i)] = {**video, **chunk}
+        self.indexes["podcast-chunks"][chunks_done_id(video['video_id'])] = {'num_chunks': len(chunks)}
+        return len(chunks)
+
+    @activity.defn
+    async def disable_refresh(self):
+        await self.request()
+        return None
+
+    @activity.defn
+    async def restore_refresh(self, refresh_interval=None):
+        await self.request()
+
+
+def fake_podcast_videos(num_videos: int):
+    @activity.defn(name="find_podcast_videos")
+    async def find_podcast_videos(commit_id):
+        return [{'video_id': f'video-{i:05d}', 'title': f'Podcast {i}'} for i in range(num_videos)]
+
+    return find_podcast_videos
+
+
+@dataclass
+class BenchmarkResult:
+    max_concurrency: int
+    batch_size: int
+    chunk_seconds: int
+    videos: int
+    indexed: int
+    skipped: int
+    failed: int
+    seconds: float
+    videos_per_second: float
+    history_events: int
+    history_bytes: int
+
+
+async def run_one(client: Client, args, options: PipelineOptions) -> BenchmarkResult:
+    # a fresh index for each run, so the previous run doesn't count as indexed
+    num_indexed = int(args.videos * args.indexed_ratio)
+    es = InMemoryElasticsearchActivities(args.es_latency, [f'video-{i:05d}' for i in range(num_indexed)])
+    youtube = FakeYouTubeActivities(args.fetch_latency, args.transcript_minutes)
+
+    main_worker = Worker(
+        client,
+        task_queue=TASK_QUEUE,
+        workflows=[PodcastTranscriptWorkflow],
+        activities=[
+            fake_podcast_videos(args.videos),
+            es.video_exists,
+            es.find_missing_videos,
+            es.find_missing_chunked_videos,
+            es.index_video,
+            es.index_videos,
+            es.index_video_chunks,
+            es.disable_refresh,
+            es.restore_refresh,
+        ],
+    )
+    youtube_worker = Worker(
+        client,
+        task_queue=YOUTUBE_TASK_QUEUE,
+        activities=[youtube.fetch_subtitles, youtube.fetch_chunks],
+        max_concurrent_activities=args.youtube_slots,
+    )
+
+    async with main_worker, youtube_worker:
+        start = time.perf_counter()
+        handle = await client.start_workflow(
+            PodcastTranscriptWorkflow.run,
+            args=("benchmark", options, ),
+            id=f"podcast-benchmark-{uuid.uuid4()}",
+            task_queue=TASK_QUEUE,
+        )
+        result = await handle.result()
+        seconds = time.perf_counter() - start
+
+        history = await handle.fetch_history()
+
+    return BenchmarkResult(
+        max_concurrency=options.max_concurrency,
+        batch_size=options.batch_size,
+        chunk_seconds=options.chunk_seconds,
+        videos=result['processed_videos'],
+        indexed=result['indexed'],
+        skipped=result['skipped'],
+        failed=len(result['failed']),
+        seconds=seconds,
+        videos_per_second=result['indexed'] / seconds,
+        history_events=len(history.events),
+        history_bytes=sum(event.ByteSize() for event in history.events),
+    )
+
+
+async def run_benchmark(args) -> list[BenchmarkResult]:
+    data_converter = create_data_converter()
+
+    if args.address:
+        env = None
+        client = await Client.connect(args.address, data_converter=data_converter)
+    else:
+        env = await WorkflowEnvironment.start_time_skipping(data_converter=data_converter)
+        client = env.client
+
+    results = []
+    try:
+        for max_concurrency, batch_size in itertools.product(args.concurrency, args.batch_size):
+            options = PipelineOptions(
+                max_concurrency=max_concurrency,
+                batch_size=batch_size,
+                chunk_seconds=args.chunk_seconds,
+            )
+            result = await run_one(client, args, options)
+            results.append(result)
+            print_result(result)
+    finally:
+        if env is not None:
+            await env.shutdown()
+
+    return results
+
+
+def print_result(r: BenchmarkResult) -> None:
+    print(
+        f'concurrency={r.max_concurrency:<4} batch={r.batch_size:<4} '
+        f'indexed={r.indexed:<5} skipped={r.skipped:<5} failed={r.failed:<3} '
+        f'time={r.seconds:7.2f}s videos/s={r.videos_per_second:7.2f} '
+        f'history={r.history_events} events, {r.history_bytes / 1024:.0f} KB'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the transcript pipeline without external services')
+    parser.add_argument('--videos', type=int, default=100)
+    parser.add_argument('--indexed-ratio', type=float, default=0.0,
+                        help='share of videos that are already indexed and get skipped')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--batch-size', type=int, nargs='+', default=[0, 20])
+    parser.add_argument('--chunk-seconds', type=int, default=0)
+    parser.add_argument('--fetch-latency', type=float, default=0.2, help='seconds per transcript fetch')
+    parser.add_argument('--transcript-minutes', type=int, default=60, help='length of the synthetic transcripts')
+    parser.add_argument('--es-latency', type=float, default=0.01, help='seconds per Elasticsearch request')
+    parser.add_argument('--youtube-slots', type=int, default=10,
+                        help='max_concurrent_activities of the fetching worker')
+    parser.add_argument('--address', help='use a running Temporal server instead of the test server')
+    parser.add_argument('--json', help='also save the results to this file')
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+
+    if args.json:
+        with open(args.json, 'w') as f_out:
+            json.dump([asdict(r) for r in results], f_out, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+import os
+import gzip
+import hashlib
+from pathlib import Path
+from typing import Sequence
+
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import DataConverter, PayloadCodec
+
+
+BLOB_REF_ENCODING = b"binary/blob-ref"
+
+ALGORITHMS = ("gzip", "zstd")
+COMPRESSION_ENCODINGS = {f"binary/{algorithm}".encode(): algorithm for algorithm in ALGORITHMS}
+
+
+def get_compressor(algorithm: str):
+    if algorithm == "gzip":
+        return gzip.compress, gzip.decompress
+
+    if algorithm == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("zstd compression needs the zstandard package: uv add zstandard") from e
+
+        return zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress
+
+    raise ValueError(f"unknown compression algorithm: {algorithm}")
+
+
+class BlobStore:
+    """Content-addressed files in a local directory, shared by the client and the workers"""
+
+    def __init__(self, blob_dir: str | Path):
+        self.blob_dir = Path(blob_dir)
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        return self.blob_dir / key[:2] / key
+
+    def put(self, data: bytes) -> str:
+        key = hashlib.sha256(data).hexdigest()
+        path = self.path(key)
+
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+
+        return key
+
+    def get(self, key: str) -> bytes:
+        return self.path(key).read_bytes()
+
+
+class CompressionCodec(PayloadCodec):
+    """
+    Compresses payloads of at least min_size bytes, so transcripts
+    don't sit in workflow history as raw JSON.
+
+    With a blob store, compressed payloads of at least blob_min_size
+    bytes are written there, and history only keeps their sha256.
+
+    `algorithm` is only used for encoding ("none" turns compression
+    off). Decoding follows the payload's own metadata, so histories
+    written with another algorithm can still be read.
+    """
+
+    def __init__(
+        self,
+        algorithm: str = "gzip",
+        min_size: int = 1024,
+        blob_store: BlobStore | None = None,
+        blob_min_size: int = 128 * 1024,
+    ):
+        self.algorithm = algorithm
+        if algorithm == "none":
+            self.encoding = None
+            self.compress = None
+        else:
+            self.encoding = f"binary/{algorithm}".encode()
+            self.compress, _ = get_compressor(algorithm)
+
+        # decompressors by encoding, created on first use
+        self.decompressors = {}
+
+        self.min_size = min_size
+        self.blob_store = blob_store
+        self.blob_min_size = blob_min_size
+
+    async def encode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        return [self.encode_payload(p) for p in payloads]
+
+    def encode_payload(self, payload: Payload) -> Payload:
+        if self.compress is None:
+            return payload
+
+        data = payload.SerializeToString()
+        if len(data) < self.min_size:
+            return payload
+
+        compressed = self.compress(data)
+
+        if self.blob_store is not None and len(compressed) >= self.blob_min_size:
+            key = self.blob_store.put(compressed)
+            return Payload(
+                metadata={"encoding": BLOB_REF_ENCODING, "compression": self.encoding},
+                data=key.encode(),
+            )
+
+        return Payload(metadata={"encoding": self.encoding}, data=compressed)
+
+    async def decode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        return [self.decode_payload(p) for p in payloads]
+
+    def get_decompressor(self, encoding: bytes):
+        if encoding not in self.decompressors:
+            if encoding not in COMPRESSION_ENCODINGS:
+                raise ValueError(f"unknown payload compression: {encoding.decode()}")
+            _, self.decompressors[encoding] = get_compressor(COMPRESSION_ENCODINGS[encoding])
+
+        return self.decompressors[encoding]
+
+    def decode_payload(self, payload: Payload) -> Payload:
+        encoding = payload.metadata.get("encoding", b"")
+
+        if encoding == BLOB_REF_ENCODING:
+            if self.blob_store is None:
+                raise ValueError("payload is stored in a blob store, but the codec doesn't have one")
+            decompress = self.get_decompressor(payload.metadata["compression"])
+            data = decompress(self.blob_store.get(payload.data.decode()))
+        elif encoding in COMPRESSION_ENCODINGS:
+            data = self.get_decompressor(encoding)(payload.data)
+        else:
+            return payload
+
+        return Payload.FromString(data)
+
+
+def create_data_converter() -> DataConverter:
+    """
+    Data converter for the client and the worker:
+
+    - PAYLOAD_COMPRESSION: gzip (default), zstd or none
+    - BLOB_STORE_DIR: directory for large payloads, off by default
+
+    The compression setting only affects new payloads, any of them can
+    read gzip and zstd payloads. With a blob store, all of them must
+    see the same directory.
+    """
+    algorithm = os.getenv("PAYLOAD_COMPRESSION", "gzip")
+
+    blob_dir = os.getenv("BLOB_STORE_DIR")
+    blob_store = BlobStore(blob_dir) if blob_dir else None
+
+    codec = CompressionCodec(algorithm=algorithm, blob_store=blob_store)
+    return DataConverter(payload_codec=codec)
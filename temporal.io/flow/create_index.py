@@ -78,11 +78,34 @@ index_settings = {
     }
 }
 
-# Create the index
-index_name = "podcasts"
+# Transcript segments (CHUNK_SECONDS in workflow.py), one document per segment
+chunks_index_settings = {
+    "settings": index_settings["settings"],
+    "mappings": {
+        "properties": {
+            "video_id": {"type": "keyword"},
+            "title": {
+                "type": "text",
+                "analyzer": "english_with_stop_and_stem",
+                "search_analyzer": "english_with_stop_and_stem"
+            },
+            "start": {"type": "float"},
+            "end": {"type": "float"},
+            # only in the "<video_id>-done" marker documents
+            "num_chunks": {"type": "integer"},
+            "text": {
+                "type": "text",
+                "analyzer": "english_with_stop_and_stem",
+                "search_analyzer": "english_with_stop_and_stem"
+            }
+        }
+    }
+}
 
-if es.indices.exists(index=index_name):
-    es.indices.delete(index=index_name)
+# Create the indexes
+for index_name, settings in [("podcasts", index_settings), ("podcast-chunks", chunks_index_settings)]:
+    if es.indices.exists(index=index_name):
+        es.indices.delete(index=index_name)
 
-es.indices.create(index=index_name, body=index_settings)
-print(f"Index '{index_name}' created successfully")
+    es.indices.create(index=index_name, body=settings)
+    print(f"Index '{index_name}' created successfully")
@@ -0,0 +1,51 @@
+import os
+import time
+
+from temporalio import activity
+from temporalio.runtime import PrometheusConfig, Runtime, TelemetryConfig
+from temporalio.worker import (
+    ActivityInboundInterceptor,
+    ExecuteActivityInput,
+    Interceptor,
+)
+
+
+def create_runtime() -> Runtime:
+    """
+    Runtime that serves the SDK metrics and ours for Prometheus on
+    PROMETHEUS_ADDRESS (0.0.0.0:9464 by default).
+    """
+    address = os.getenv("PROMETHEUS_ADDRESS", "0.0.0.0:9464")
+    return Runtime(telemetry=TelemetryConfig(metrics=PrometheusConfig(bind_address=address)))
+
+
+class MetricsInterceptor(Interceptor):
+    """Duration histogram and retry counter for every activity, by activity type"""
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return _MetricsActivityInboundInterceptor(next)
+
+
+class _MetricsActivityInboundInterceptor(ActivityInboundInterceptor):
+
+    async def execute_activity(self, input: ExecuteActivityInput):
+        info = activity.info()
+        meter = activity.metric_meter()
+        attributes = {"activity_type": info.activity_type}
+
+        if info.attempt > 1:
+            meter.create_counter(
+                "podcast_activity_retries", "Activity attempts after the first one",
+            ).add(1, attributes)
+
+        start = time.monotonic()
+        outcome = "failed"
+        try:
+            result = await self.next.execute_activity(input)
+            outcome = "completed"
+            return result
+        finally:
+            duration_ms = (time.monotonic() - start) * 1000
+            meter.create_histogram_float(
+                "podcast_activity_duration", "Activity durations", "ms",
+            ).record(duration_ms, {**attributes, "outcome": outcome})
@@ -0,0 +1,94 @@
+import time
+import threading
+
+
+class RateLimited(Exception):
+    """No token within the allowed wait. `retry_after` is how long until there is one."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"rate limited, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by all activity threads of a worker.
+
+    `acquire` blocks until a token is available, but at most `max_wait`
+    seconds. The rate adapts to the provider (AIMD): every throttled
+    request halves it and pauses all callers with an exponential
+    backoff, every successful request increases it a little, up to
+    `max_rate`.
+    """
+
+    def __init__(
+        self,
+        max_rate: float,
+        burst: int = 1,
+        min_rate: float = 0.05,
+        increase: float = 0.05,
+        backoff_base: float = 5.0,
+        backoff_max: float = 300.0,
+    ):
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.increase = increase
+        self.burst = burst
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.rate = max_rate
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+        self.throttled_in_row = 0
+        self.paused_until = 0.0
+
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def acquire(self, max_wait: float | None = None) -> None:
+        """
+        Take a token. Raises RateLimited instead of sleeping longer than
+        `max_wait` seconds in total, e.g. while paused after a throttle.
+        """
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+
+            if deadline is not None and now + wait > deadline:
+                raise RateLimited(wait)
+
+            time.sleep(wait)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.throttled_in_row = 0
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttled(self) -> float:
+        """Slow down after a throttled request. Returns the pause in seconds."""
+        with self._lock:
+            self.throttled_in_row += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+
+            backoff = min(self.backoff_max, self.backoff_base * 2 ** (self.throttled_in_row - 1))
+            self.paused_until = max(self.paused_until, time.monotonic() + backoff)
+            self.tokens = 0.0
+
+            return self.paused_until - time.monotonic()
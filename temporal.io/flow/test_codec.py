@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from temporalio.converter import DataConverter
+
+from codec import BlobStore, CompressionCodec
+
+
+def make_payloads():
+    transcript = '\n'.join(f'0:{i:02d}:00 some words about data engineering' for i in range(60))
+    return DataConverter.default.payload_converter.to_payloads([transcript, 'short'])
+
+
+def round_trip(encoder, decoder):
+    payloads = make_payloads()
+    encoded = asyncio.run(encoder.encode(payloads))
+    decoded = asyncio.run(decoder.decode(encoded))
+    return payloads, encoded, decoded
+
+
+def test_compresses_large_payloads():
+    payloads, encoded, decoded = round_trip(CompressionCodec('gzip'), CompressionCodec('gzip'))
+
+    assert encoded[0].metadata['encoding'] == b'binary/gzip'
+    assert len(encoded[0].data) < len(payloads[0].data)
+    assert encoded[1] == payloads[1]
+    assert decoded == payloads
+
+
+@pytest.mark.parametrize('decoder_algorithm', ['zstd', 'none'])
+def test_decodes_payloads_of_another_algorithm(decoder_algorithm):
+    if decoder_algorithm == 'zstd':
+        pytest.importorskip('zstandard')
+
+    payloads, _, decoded = round_trip(CompressionCodec('gzip'), CompressionCodec(decoder_algorithm))
+
+    assert decoded == payloads
+
+
+def test_none_leaves_payloads_as_they_are():
+    payloads, encoded, _ = round_trip(CompressionCodec('none'), CompressionCodec('none'))
+
+    assert encoded == payloads
+
+
+def test_blob_store_with_another_algorithm(tmp_path):
+    pytest.importorskip('zstandard')
+    blob_store = BlobStore(tmp_path)
+
+    encoder = CompressionCodec('zstd', blob_store=blob_store, blob_min_size=0)
+    decoder = CompressionCodec('gzip', blob_store=blob_store)
+    payloads, encoded, decoded = round_trip(encoder, decoder)
+
+    assert encoded[0].metadata['encoding'] == b'binary/blob-ref'
+    assert decoded == payloads
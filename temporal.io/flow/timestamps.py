@@ -0,0 +1,25 @@
+"""
+The "M:SS" / "H:MM:SS" timestamps of the indexed subtitles.
+
+The agent is a separate project with its own copy in
+`../agent/tools.py`, keep the two in sync.
+"""
+
+
+def format_timestamp(seconds: float) -> str:
+    """Convert seconds to H:MM:SS if > 1 hour, else M:SS"""
+    total_seconds = int(seconds)
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+
+    if hours == 0:
+        return f"{minutes}:{secs:02}"
+    return f"{hours}:{minutes:02}:{secs:02}"
+
+
+def parse_timestamp(ts: str) -> int:
+    """Convert H:MM:SS or M:SS to seconds"""
+    seconds = 0
+    for part in ts.strip().split(':'):
+        seconds = seconds * 60 + int(part)
+    return seconds
@@ -0,0 +1,170 @@
+"""
+Local transcript cache, so reindexing doesn't fetch from YouTube again.
+
+Warm it up before a reindex:
+
+    uv run python transcript_cache.py warm --commit-id <commit>
+    uv run python transcript_cache.py import data/
+"""
+
+import json
+import zlib
+import sqlite3
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+from timestamps import parse_timestamp
+
+
+DEFAULT_LANGUAGE = 'en'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transcripts (
+    video_id TEXT NOT NULL,
+    language TEXT NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES blobs (sha256),
+    fetched_at TEXT NOT NULL,
+    PRIMARY KEY (video_id, language)
+);
+"""
+
+
+class TranscriptCache:
+    """
+    Raw transcript snippets ({text, start, duration}) in SQLite.
+
+    Transcripts are stored compressed and content-addressed: the
+    (video_id, language) table points to a blob by its sha256, so
+    identical transcripts are kept once.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # a connection per call: activities run in several threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, video_id: str, language: str = DEFAULT_LANGUAGE) -> list[dict] | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT b.data FROM transcripts t JOIN blobs b ON b.sha256 = t.sha256 '
+                'WHERE t.video_id = ? AND t.language = ?',
+                (video_id, language),
+            ).fetchone()
+
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, video_id: str, snippets: list[dict], language: str = DEFAULT_LANGUAGE) -> str:
+        raw = json.dumps(snippets, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        sha256 = hashlib.sha256(raw).hexdigest()
+        fetched_at = datetime.now(timezone.utc).isoformat()
+
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR IGNORE INTO blobs (sha256, data) VALUES (?, ?)',
+                (sha256, zlib.compress(raw, 9)),
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO transcripts (video_id, language, sha256, fetched_at) VALUES (?, ?, ?, ?)',
+                (video_id, language, sha256, fetched_at),
+            )
+
+        return sha256
+
+    def video_ids(self, language: str = DEFAULT_LANGUAGE) -> set[str]:
+        with self._connect() as conn:
+            rows = conn.execute('SELECT video_id FROM transcripts WHERE language = ?', (language,))
+            return {video_id for (video_id,) in rows}
+
+
+def parse_subtitles(subtitles: str) -> list[dict]:
+    """Snippets back from `make_subtitles` output. Durations aren't kept there, so they are 0."""
+    snippets = []
+
+    for line in subtitles.splitlines():
+        ts, _, text = line.partition(' ')
+        if not ts or not ts.replace(':', '').isdigit():
+            continue
+        snippets.append({'text': text, 'start': float(parse_timestamp(ts)), 'duration': 0.0})
+
+    return snippets
+
+
+def import_directory(cache: TranscriptCache, directory: str | Path) -> int:
+    """Import `<video_id>.txt` files (title, empty line, subtitles) that aren't cached yet."""
+    cached = cache.video_ids()
+    imported = 0
+
+    for path in sorted(Path(directory).glob('*.txt')):
+        video_id = path.stem
+        if video_id in cached:
+            continue
+
+        _title, _, subtitles = path.read_text(encoding='utf-8').partition('\n\n')
+        cache.put(video_id, parse_subtitles(subtitles))
+        imported += 1
+
+    return imported
+
+
+def warm(cache: TranscriptCache, commit_id: str, use_proxy: bool = True) -> tuple[int, int]:
+    """Fetch the transcripts of all podcast videos that aren't cached yet."""
+    from tqdm.auto import tqdm
+    from activities import YouTubeActivities, find_podcast_videos
+
+    # outside Temporal nobody retries later, so wait out the throttling pauses
+    yt_activities = YouTubeActivities(use_proxy=use_proxy, cache=cache, max_wait=None)
+
+    cached = cache.video_ids()
+    missing = [v['video_id'] for v in find_podcast_videos(commit_id) if v['video_id'] not in cached]
+
+    failed = 0
+    for video_id in tqdm(missing):
+        try:
+            yt_activities.fetch_transcript(video_id)
+        except Exception as e:
+            print(f'Failed to fetch {video_id}: {e}')
+            failed += 1
+
+    return len(missing) - failed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the local transcript cache')
+    parser.add_argument('--cache', default='transcripts.db', help='path to the SQLite cache')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    warm_parser = subparsers.add_parser('warm', help='prefetch transcripts of all podcast videos')
+    warm_parser.add_argument('--commit-id', required=True, help='datatalksclub.github.io commit with events.yaml')
+    warm_parser.add_argument('--no-proxy', action='store_true')
+
+    import_parser = subparsers.add_parser('import', help='import <video_id>.txt transcripts from a directory')
+    import_parser.add_argument('directory')
+
+    args = parser.parse_args()
+    cache = TranscriptCache(args.cache)
+
+    if args.command == 'warm':
+        fetched, failed = warm(cache, args.commit_id, use_proxy=not args.no_proxy)
+        print(f'Fetched {fetched} transcripts, {failed} failed')
+    else:
+        imported = import_directory(cache, args.directory)
+        print(f'Imported {imported} transcripts')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,41 +1,100 @@
+import os
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
 from temporalio.worker import Worker
 from temporalio.client import Client
 
-from workflow import PodcastTranscriptWorkflow
+from workflow import PodcastTranscriptWorkflow, TASK_QUEUE, YOUTUBE_TASK_QUEUE
 
 from activities import (
     YouTubeActivities,
     ElasticsearchActivities,
+    DiscoveryActivities,
     find_podcast_videos,
 )
+from transcript_cache import TranscriptCache
+from codec import create_data_converter
+from metrics import MetricsInterceptor, create_runtime
 
 
-async def run_worker():
-    client = await Client.connect("localhost:7233")
+def env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
 
-    executor = ThreadPoolExecutor(max_workers=10)
 
-    yt_activities = YouTubeActivities()
-    es_activities = ElasticsearchActivities()
+def create_main_worker(client: Client) -> Worker:
+    """Workflows, Elasticsearch and discovery activities"""
+    es_activities = ElasticsearchActivities(pool_size=env_int('ES_POOL_SIZE', 10))
+    discovery_activities = DiscoveryActivities()
 
-    worker = Worker(
+    return Worker(
         client,
-        task_queue="podcast_transcript_task_queue",
+        task_queue=TASK_QUEUE,
         workflows=[PodcastTranscriptWorkflow],
         activities=[
+            # sync, run in activity_executor
             find_podcast_videos,
-            yt_activities.fetch_subtitles,
+            discovery_activities.find_changed_podcast_videos,
+            discovery_activities.save_discovery_state,
+            # async, run in the event loop
             es_activities.video_exists,
+            es_activities.find_missing_videos,
+            es_activities.find_missing_chunked_videos,
             es_activities.index_video,
+            es_activities.index_videos,
+            es_activities.index_video_chunks,
+            es_activities.disable_refresh,
+            es_activities.restore_refresh,
         ],
-        activity_executor=executor,
+        activity_executor=ThreadPoolExecutor(max_workers=env_int('MAIN_POOL_SIZE', 4)),
+        max_concurrent_activities=env_int('MAIN_MAX_CONCURRENT_ACTIVITIES', 50),
+        interceptors=[MetricsInterceptor()],
+    )
+
+
+def create_youtube_worker(client: Client) -> Worker:
+    """Subtitle fetching: sync (youtube-transcript-api has no async API), on its own pool"""
+    pool_size = env_int('YOUTUBE_POOL_SIZE', 10)
+
+    yt_activities = YouTubeActivities(
+        requests_per_second=float(os.getenv('YOUTUBE_REQUESTS_PER_SECOND', '1.0')),
+        pool_size=pool_size,
+        cache=TranscriptCache(os.getenv('TRANSCRIPT_CACHE', 'transcripts.db')),
     )
 
-    await worker.run()
+    return Worker(
+        client,
+        task_queue=YOUTUBE_TASK_QUEUE,
+        activities=[
+            yt_activities.fetch_subtitles,
+            yt_activities.fetch_chunks,
+        ],
+        activity_executor=ThreadPoolExecutor(max_workers=pool_size),
+        # more would only wait for a thread
+        max_concurrent_activities=env_int('YOUTUBE_MAX_CONCURRENT_ACTIVITIES', pool_size),
+        interceptors=[MetricsInterceptor()],
+    )
+
+
+WORKERS = {
+    'main': create_main_worker,
+    'youtube': create_youtube_worker,
+}
+
+
+async def run_worker():
+    client = await Client.connect(
+        "localhost:7233",
+        data_converter=create_data_converter(),
+        runtime=create_runtime(),
+    )
+
+    # WORKER_ROLES=youtube runs only the fetching worker, e.g. on another machine
+    roles = os.getenv('WORKER_ROLES', 'main,youtube').split(',')
+    workers = [WORKERS[role.strip()](client) for role in roles]
+
+    await asyncio.gather(*(worker.run() for worker in workers))
 
 
 if __name__ == "__main__":
-    asyncio.run(run_worker())
\ No newline at end of file
+    asyncio.run(run_worker())
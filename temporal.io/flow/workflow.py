@@ -1,75 +1,312 @@
+import asyncio
+from dataclasses import dataclass
 from datetime import timedelta
+
 from temporalio import workflow
+from temporalio.exceptions import ActivityError
 
 with workflow.unsafe.imports_passed_through():
     from activities import (
         YouTubeActivities,
         ElasticsearchActivities,
+        DiscoveryActivities,
         find_podcast_videos,
     )
 
 
+TASK_QUEUE = "podcast_transcript_task_queue"
+# YouTube fetches are slow and rate-limited, they get their own queue
+# so they don't hold up the Elasticsearch activities
+YOUTUBE_TASK_QUEUE = "podcast_transcript_youtube_task_queue"
+
+
+@dataclass
+class PipelineOptions:
+    # how many videos are processed at the same time
+    max_concurrency: int = 1
+    # 0 indexes every video on its own, otherwise transcripts are
+    # buffered and indexed with the bulk API in batches of this size
+    batch_size: int = 0
+    # flush the buffer earlier when the transcripts reach this many bytes;
+    # keep it under Temporal's 2 MB payload limit
+    batch_bytes: int = 1_500_000
+    # > 0 indexes transcripts as segments of this many seconds into the
+    # "podcast-chunks" index instead of whole transcripts into "podcasts"
+    chunk_seconds: int = 0
+    # only process videos added or changed since the last incremental run
+    incremental: bool = False
+
+
 @workflow.defn
 class PodcastTranscriptWorkflow:
 
+    def __init__(self):
+        self.indexed = 0
+        self.failed = []
+
+        self.buffer = []
+        self.buffer_bytes = 0
+
+        # progress and metrics
+        self.started_at = workflow.now()
+        self.total = 0
+        self.skipped = 0
+        self.subtitles_bytes = 0
+        self.activity_stats = {}
+
+        meter = workflow.metric_meter()
+        self.videos_counter = meter.create_counter(
+            "podcast_videos", "Videos by outcome: indexed, skipped or failed",
+        )
+        self.bytes_counter = meter.create_counter(
+            "podcast_subtitles_bytes", "Bytes of fetched subtitles", "bytes",
+        )
+
+    async def execute_activity(self, activity, **kwargs):
+        """workflow.execute_activity that also records how long the activity took"""
+        start = workflow.now()
+        try:
+            return await workflow.execute_activity(activity=activity, **kwargs)
+        finally:
+            seconds = (workflow.now() - start).total_seconds()
+            stats = self.activity_stats.setdefault(activity.__name__, {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+    def count_videos(self, outcome: str, n: int = 1) -> None:
+        if n > 0:
+            self.videos_counter.add(n, {"outcome": outcome})
+
+    def count_bytes(self, n: int) -> None:
+        self.subtitles_bytes += n
+        self.bytes_counter.add(n)
+
+    @workflow.query
+    def progress(self) -> dict:
+        elapsed = (workflow.now() - self.started_at).total_seconds()
+        processed = self.indexed + len(self.failed)
+
+        return {
+            "total": self.total,
+            "processed": processed,
+            "indexed": self.indexed,
+            "skipped": self.skipped,
+            "failed": len(self.failed),
+            "buffered": len(self.buffer),
+            "subtitles_bytes": self.subtitles_bytes,
+            "elapsed_seconds": elapsed,
+            "videos_per_minute": processed / elapsed * 60 if elapsed > 0 else 0.0,
+            "activities": self.activity_stats,
+        }
+
     @workflow.run
-    async def run(self, commit_id: str) -> dict:
+    async def run(self, commit_id: str, options: PipelineOptions | None = None) -> dict:
+        if options is None:
+            options = PipelineOptions()
+
         workflow.logger.info(f"Finding podcast videos from commit {commit_id}...")
-        
-        videos = await workflow.execute_activity(
-            activity=find_podcast_videos,
-            args=(commit_id,),
+
+        # changed videos are already indexed and are reindexed without the check below
+        changed = []
+
+        if options.incremental:
+            discovered = await self.execute_activity(
+                activity=DiscoveryActivities.find_changed_podcast_videos,
+                args=(commit_id,),
+                start_to_close_timeout=timedelta(minutes=1),
+            )
+            videos = discovered['added']
+            changed = discovered['changed']
+        else:
+            videos = await self.execute_activity(
+                activity=find_podcast_videos,
+                args=(commit_id,),
+                start_to_close_timeout=timedelta(minutes=1),
+            )
+
+        video_ids = [video['video_id'] for video in videos]
+
+        if options.chunk_seconds > 0:
+            find_missing = ElasticsearchActivities.find_missing_chunked_videos
+        else:
+            find_missing = ElasticsearchActivities.find_missing_videos
+
+        missing_ids = await self.execute_activity(
+            activity=find_missing,
+            args=(video_ids, ),
             start_to_close_timeout=timedelta(minutes=1),
         )
 
-        workflow.logger.info("Connecting to Elasticsearch...")
+        missing_ids = set(missing_ids)
+        new_videos = [video for video in videos if video['video_id'] in missing_ids]
+        skipped = len(videos) - len(new_videos)
+        new_videos = new_videos + changed
+
+        self.total = len(new_videos)
+        self.skipped = skipped
+        self.count_videos("skipped", skipped)
+
+        workflow.logger.info(f"{skipped} videos already processed, {len(new_videos)} to process")
+
+        if options.batch_size > 0 and options.chunk_seconds == 0 and new_videos:
+            await self.backfill(new_videos, options)
+        else:
+            await self.process_videos(new_videos, options)
+
+        if options.incremental:
+            await self.execute_activity(
+                activity=DiscoveryActivities.save_discovery_state,
+                args=(commit_id, videos + changed, self.failed, ),
+                start_to_close_timeout=timedelta(seconds=30),
+            )
+
+        return {
+            "status": "completed",
+            "processed_videos": len(videos) + len(changed),
+            "indexed": self.indexed,
+            "skipped": skipped,
+            "failed": self.failed,
+            "metrics": self.progress(),
+        }
+
+    async def backfill(self, videos: list[dict], options: PipelineOptions) -> None:
+        # refreshing the index after every bulk request only slows the backfill down
+        refresh_interval = await self.execute_activity(
+            activity=ElasticsearchActivities.disable_refresh,
+            start_to_close_timeout=timedelta(seconds=30),
+        )
+
+        try:
+            await self.process_videos(videos, options)
+            await self.flush()
+        finally:
+            await self.execute_activity(
+                activity=ElasticsearchActivities.restore_refresh,
+                args=(refresh_interval, ),
+                start_to_close_timeout=timedelta(minutes=1),
+            )
+
+    async def process_videos(self, videos: list[dict], options: PipelineOptions) -> None:
+        workflow.logger.info(f"Processing videos, up to {options.max_concurrency} at a time...")
+
+        # asyncio primitives are deterministic inside workflows
+        semaphore = asyncio.Semaphore(options.max_concurrency)
 
-        for video in videos:
-            video_id = video['video_id']
+        async def process_with_limit(video):
+            async with semaphore:
+                await self.process_video(video, options)
 
-            if await workflow.execute_activity(
-                activity=ElasticsearchActivities.video_exists,
-                args=(video_id, ),
-                start_to_close_timeout=timedelta(seconds=10),
-            ):
-                workflow.logger.info(f'already processed {video_id}')
-                continue
+        await asyncio.gather(*(process_with_limit(video) for video in videos))
 
-            subtitles = await workflow.execute_activity(
+    async def process_video(self, video: dict, options: PipelineOptions) -> None:
+        video_id = video['video_id']
+
+        try:
+            if options.chunk_seconds > 0:
+                await self.process_video_chunks(video, options)
+                return
+
+            subtitles = await self.execute_activity(
                 activity=YouTubeActivities.fetch_subtitles,
+                task_queue=YOUTUBE_TASK_QUEUE,
                 args=(video_id,),
                 start_to_close_timeout=timedelta(minutes=1),
             )
+            self.count_bytes(len(subtitles.encode('utf-8')))
+
+            if options.batch_size > 0:
+                self.buffer.append({'video': video, 'subtitles': subtitles})
+                self.buffer_bytes += len(subtitles.encode('utf-8'))
+
+                if len(self.buffer) >= options.batch_size or self.buffer_bytes >= options.batch_bytes:
+                    await self.flush()
+                return
 
-            await workflow.execute_activity(
+            await self.execute_activity(
                 activity=ElasticsearchActivities.index_video,
                 args=(video, subtitles, ),
                 start_to_close_timeout=timedelta(seconds=30),
             )
-        
-        return {
-            "status": "completed",
-            "processed_videos": len(videos),
-        }    
+            self.indexed += 1
+            self.count_videos("indexed")
+        except ActivityError as e:
+            # one broken video shouldn't stop the other pipelines
+            workflow.logger.error(f'failed to process {video_id}: {e}')
+            self.failed.append(video_id)
+            self.count_videos("failed")
+
+    async def process_video_chunks(self, video: dict, options: PipelineOptions) -> None:
+        chunks = await self.execute_activity(
+            activity=YouTubeActivities.fetch_chunks,
+            task_queue=YOUTUBE_TASK_QUEUE,
+            args=(video['video_id'], options.chunk_seconds, ),
+            start_to_close_timeout=timedelta(minutes=1),
+        )
+        self.count_bytes(sum(len(chunk['text'].encode('utf-8')) for chunk in chunks))
+
+        await self.execute_activity(
+            activity=ElasticsearchActivities.index_video_chunks,
+            args=(video, chunks, ),
+            start_to_close_timeout=timedelta(seconds=30),
+        )
+        self.indexed += 1
+        self.count_videos("indexed")
+
+    async def flush(self) -> None:
+        if not self.buffer:
+            return
+
+        items = self.buffer
+        self.buffer = []
+        self.buffer_bytes = 0
+
+        try:
+            result = await self.execute_activity(
+                activity=ElasticsearchActivities.index_videos,
+                args=(items, ),
+                start_to_close_timeout=timedelta(minutes=2),
+            )
+        except ActivityError as e:
+            workflow.logger.error(f'failed to index a batch of {len(items)} videos: {e}')
+            self.failed.extend(item['video']['video_id'] for item in items)
+            self.count_videos("failed", len(items))
+            return
+
+        self.indexed += result['indexed']
+        self.count_videos("indexed", result['indexed'])
+        for error in result['errors']:
+            workflow.logger.error(f"failed to index {error['video_id']}: {error['error']}")
+            self.failed.append(error['video_id'])
+        self.count_videos("failed", len(result['errors']))
 
 
 # putting imports here to make it easier for the tutorial structure
-import asyncio
+import os
 
 from temporalio.client import Client
 
+from codec import create_data_converter
+
 
 
 async def run_workflow():
-    client = await Client.connect("localhost:7233")
+    client = await Client.connect("localhost:7233", data_converter=create_data_converter())
 
     commit_id = '187b7d056a36d5af6ac33e4c8096c52d13a078a7'
 
+    options = PipelineOptions(
+        max_concurrency=int(os.getenv('MAX_CONCURRENCY', '10')),
+        batch_size=int(os.getenv('BATCH_SIZE', '0')),
+        chunk_seconds=int(os.getenv('CHUNK_SECONDS', '0')),
+        incremental=os.getenv('INCREMENTAL', '0') == '1',
+    )
+
     result = await client.execute_workflow(
         PodcastTranscriptWorkflow.run,
-        args=(commit_id, ),
+        args=(commit_id, options, ),
         id="podcast_transcript_workflow",
-        task_queue="podcast_transcript_task_queue",
+        task_queue=TASK_QUEUE,
     )
 
     print("Workflow completed! Result:", result)